@@ -0,0 +1,335 @@
+"""
+Retrieval scaling benchmark over synthetic knowledge bases
+Generates venues in the same style as my_city_info.txt (floor headings, entries with
+Location:/Hours: fields, Q&A pairs, prose) at several sizes and, for every retrieval
+mode, times indexing and per-query search and measures memory and top-k stability.
+Results carry the git commit so runs can be compared across changes.
+
+Usage:
+    python bench_retrieval.py
+    python bench_retrieval.py --sizes 1000,10000,100000,1000000 --out retrieval_bench.json
+    python bench_retrieval.py --baseline retrieval_bench.json
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from knowledge_base import KnowledgeBase, rank_sections
+from keyword_matcher import load_keyword_table
+from embedders import get_embedder
+from vector_index import VectorIndex
+from index_file import write_index_file
+
+TOP_K = 4
+MODES = ("keyword", "bm25", "vector", "keyword_mapped", "bm25_mapped")
+
+# ==========================
+# SYNTHETIC KNOWLEDGE BASES
+# ==========================
+ADJECTIVES = [
+    "Golden", "Silver", "Blue", "Green", "Royal", "Urban", "Sunny", "Little", "Grand", "Happy",
+    "Red", "Crystal", "Lucky", "Modern", "Classic", "Bright", "Quiet", "Wild", "Fresh", "Ocean",
+]
+NOUNS = [
+    "Lotus", "Harbor", "Maple", "Falcon", "Orchid", "River", "Summit", "Lantern", "Garden", "Pearl",
+    "Cedar", "Comet", "Willow", "Anchor", "Tiger", "Meadow", "Bridge", "Island", "Crown", "Forest",
+]
+# (kind, category line, description) - several kinds use words from location_keywords.json
+KINDS = [
+    ("Café", "Coffee and pastries", "Serves espresso drinks, fresh pastries and light breakfast items."),
+    ("Wok", "Chinese dishes", "Known for fried rice, noodles and dim sum."),
+    ("Spice Kitchen", "Sri Lankan food", "Offers rice and curry, kottu roti and hoppers."),
+    ("Pizzeria", "Pizza and pasta", "Wood-fired pizza, pasta and salads for families."),
+    ("Burger Bar", "Burgers and fries", "Grilled burgers, fries and milkshakes."),
+    ("Boutique", "Fashion and apparel", "Clothing for men, women and children, plus accessories."),
+    ("Electronics", "Phones and computers", "Mobile phones, laptops, gaming consoles and repairs."),
+    ("Toys", "Toys and games", "Toys, puzzles and board games for all ages."),
+    ("Books", "Books and stationery", "New releases, magazines and school supplies."),
+    ("Pharmacy", "Health and pharmacy", "Prescriptions, vitamins and personal care products."),
+    ("Salon", "Hair and beauty", "Haircuts, styling and beauty treatments."),
+    ("Jewelers", "Jewelry and watches", "Gold, silver and watch repairs."),
+]
+ZONES = ["near the escalators", "next to the food court", "by the north entrance", "beside the elevators",
+         "opposite the information desk", "near the south atrium"]
+HOURS = ["8:00 AM - 8:00 PM", "9:00 AM - 9:00 PM", "10:00 AM - 10:00 PM", "7:00 AM - 10:00 PM", "11:00 AM - 11:00 PM"]
+PROSE = [
+    "Seating areas on this level accommodate large groups and families.",
+    "Washrooms on this level are near the escalators and include accessible facilities.",
+    "Free Wi-Fi is available throughout this level.",
+    "Security staff patrol this level and can help with directions.",
+    "Seasonal promotions and events are held in the atrium on this level.",
+]
+
+class SyntheticEntry:
+    """A generated entry and the questions whose answer it holds"""
+
+    def __init__(self, name: str, floor: int, kind: str, category: str, hours: str):
+        self.name = name
+        self.floor = floor
+        self.kind = kind
+        self.category = category
+        self.hours = hours
+
+def entry_name(i: int) -> str:
+    """Unique, pronounceable store names: 'Golden Lotus Café', then 'Golden Lotus Café 2'..."""
+    adjective = ADJECTIVES[i % len(ADJECTIVES)]
+    noun = NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]
+    kind = KINDS[(i // (len(ADJECTIVES) * len(NOUNS))) % len(KINDS)][0]
+    repeat = i // (len(ADJECTIVES) * len(NOUNS) * len(KINDS))
+    return f"{adjective} {noun} {kind}" + (f" {repeat + 1}" if repeat else "")
+
+def generate_kb(sections: int, seed: int = 0) -> Tuple[str, List[SyntheticEntry]]:
+    """
+    Knowledge base text with about `sections` chunks, and the entries it describes
+    Roughly 70% entries, 20% Q&A pairs and 10% prose, under one heading per floor.
+    """
+    rng = random.Random(seed)
+    floors = max(3, sections // 250)
+    per_floor = -(-sections // floors)
+    blocks = [f"Synthetic Mall {sections} - Complete Guide", "Overview",
+              f"Welcome to Synthetic Mall, a generated venue with {floors} floors used for retrieval benchmarks."]
+    entries: List[SyntheticEntry] = []
+
+    for floor in range(1, floors + 1):
+        blocks.append(f"Level {floor}")
+        floor_entries: List[SyntheticEntry] = []
+        for _ in range(per_floor):
+            roll = rng.random()
+            if roll < 0.2 and floor_entries:
+                entry = rng.choice(floor_entries)
+                blocks.append(f"Where is {entry.name}?\n{entry.name} is on level {floor}, {rng.choice(ZONES)}.")
+            elif roll < 0.3:
+                blocks.append(rng.choice(PROSE).replace("this level", f"level {floor}"))
+            else:
+                name = entry_name(len(entries))
+                kind = next(k for k in KINDS if name.split(" ", 2)[2].startswith(k[0]))
+                entry = SyntheticEntry(name, floor, kind[0], kind[1], rng.choice(HOURS))
+                blocks.append(
+                    f"{name}\nCategory: {kind[1]}\nLocation: Level {floor}, {rng.choice(ZONES)}\n"
+                    f"Hours: {entry.hours}\n{kind[2]}"
+                )
+                entries.append(entry)
+                floor_entries.append(entry)
+    return "\n\n".join(blocks), entries
+
+def generate_queries(entries: List[SyntheticEntry], count: int, seed: int = 0) -> List[Tuple[str, Optional[str]]]:
+    """(query, name of the entry that answers it, or None for broad questions)"""
+    rng = random.Random(seed)
+    templates = [
+        "Where is {name}?",
+        "What time does {name} open?",
+        "how do I get to {name}",
+        "is {name} on level {floor}",
+    ]
+    broad = [
+        "where can I get coffee", "Chinese food", "where is the washroom", "sri lankan restaurant",
+        "I need a pharmacy", "toys for my kids", "where can I buy a phone", "pizza near me",
+    ]
+    queries = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            queries.append((rng.choice(broad), None))
+        else:
+            entry = rng.choice(entries)
+            queries.append((rng.choice(templates).format(name=entry.name, floor=entry.floor), entry.name))
+    return queries
+
+# ==========================
+# MEASUREMENT
+# ==========================
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux), after a collection"""
+    gc.collect()
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def timed(fn, *args, **kwargs):
+    """(result, seconds, resident bytes added)"""
+    before = rss_bytes()
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    after = rss_bytes()
+    return result, elapsed, (after - before) if before is not None and after is not None else None
+
+def latency_report(seconds: List[float]) -> Dict[str, float]:
+    micros = np.array(seconds) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(micros, 50)), 1),
+        "p95_us": round(float(np.percentile(micros, 95)), 1),
+        "mean_us": round(float(micros.mean()), 1),
+        "qps": round(float(len(micros) / (micros.sum() / 1e6)), 1) if micros.sum() else None,
+    }
+
+def run_queries(knowledge_base: KnowledgeBase, mode: str, queries: List[Tuple[str, Optional[str]]]):
+    """Latencies and the top-k ids for each query"""
+    rank_mode = mode.replace("_mapped", "")
+    rank_sections(queries[0][0], knowledge_base, rank_mode, TOP_K)  # Warm-up
+    latencies, top_ids = [], []
+    for query, _ in queries:
+        started = time.perf_counter()
+        ranked = rank_sections(query, knowledge_base, rank_mode, TOP_K)
+        latencies.append(time.perf_counter() - started)
+        top_ids.append([section_id for _, section_id in ranked])
+    return latencies, top_ids
+
+def hit_rate(knowledge_base: KnowledgeBase, queries: List[Tuple[str, Optional[str]]], top_ids: List[List[int]]) -> Optional[float]:
+    """Share of targeted queries whose entry (or a Q&A about it) is in the top-k"""
+    targeted = [(target, ids) for (_, target), ids in zip(queries, top_ids) if target]
+    if not targeted:
+        return None
+    hits = sum(
+        any(knowledge_base.section_bodies[i].startswith((target + "\n", f"Where is {target}?")) for i in ids)
+        for target, ids in targeted
+    )
+    return round(hits / len(targeted), 4)
+
+def jaccard(a: List[int], b: List[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(set(a) & set(b)) / len(set(a) | set(b))
+
+def bench_size(sections: int, queries_per_size: int, modes: List[str], seed: int, workdir: str) -> Dict:
+    text, entries = generate_kb(sections, seed)
+    queries = generate_queries(entries, queries_per_size, seed)
+    keyword_table = load_keyword_table("./location_keywords.json")
+    print(f"\n📚 {sections} sections requested: {len(text) / 1e6:.1f} MB of text, {len(entries)} entries")
+
+    knowledge_base, build_s, build_rss = timed(KnowledgeBase, text, keyword_table=keyword_table)
+    report: Dict = {
+        "sections": len(knowledge_base),
+        "text_bytes": len(text.encode("utf-8")),
+        "queries": len(queries),
+        "build": {"keyword": {"seconds": round(build_s, 3), "rss_bytes": build_rss}},
+        "modes": {},
+    }
+    print(f"   keyword index: {build_s:.2f}s")
+
+    if "bm25" in modes or "bm25_mapped" in modes:
+        _, seconds, rss = timed(knowledge_base.get_bm25_index)
+        report["build"]["bm25"] = {"seconds": round(seconds, 3), "rss_bytes": rss}
+        print(f"   bm25 index: {seconds:.2f}s")
+    if "vector" in modes:
+        embedder = get_embedder("hashing")
+        knowledge_base.vector_index, seconds, rss = timed(VectorIndex.build, knowledge_base.sections, embedder)
+        report["build"]["vector"] = {"seconds": round(seconds, 3), "rss_bytes": rss}
+        print(f"   vector index (hashing): {seconds:.2f}s")
+    report["memory_estimate_bytes"] = knowledge_base.memory_estimate()
+
+    mapped = None
+    if any(mode.endswith("_mapped") for mode in modes):
+        index_path = os.path.join(workdir, f"bench_{sections}.bin")
+        size, seconds, _ = timed(write_index_file, index_path, knowledge_base)
+        mapped, open_s, open_rss = timed(
+            KnowledgeBase.from_index_file, index_path, keyword_table=keyword_table,
+            chunking=knowledge_base.chunking, max_chunk_chars=knowledge_base.max_chunk_chars
+        )
+        report["build"]["index_file"] = {
+            "write_seconds": round(seconds, 3), "bytes": size,
+            "open_seconds": round(open_s, 4), "open_rss_bytes": open_rss
+        }
+        print(f"   index file: written in {seconds:.2f}s ({size / 1e6:.1f} MB), opened in {open_s * 1000:.1f}ms")
+
+    in_memory_ids: Dict[str, List[List[int]]] = {}
+    for mode in modes:
+        target = mapped if mode.endswith("_mapped") else knowledge_base
+        latencies, top_ids = run_queries(target, mode, queries)
+        _, repeat_ids = run_queries(target, mode, queries)
+        result = latency_report(latencies)
+        result["hit_rate"] = hit_rate(knowledge_base, queries, top_ids)
+        result["deterministic"] = top_ids == repeat_ids
+        base_mode = mode.replace("_mapped", "")
+        if mode.endswith("_mapped") and base_mode in in_memory_ids:
+            result["matches_in_memory"] = round(float(np.mean(
+                [a == b for a, b in zip(top_ids, in_memory_ids[base_mode])]
+            )), 4)
+        else:
+            in_memory_ids[mode] = top_ids
+        result["top_ids"] = top_ids
+        report["modes"][mode] = result
+        print(f"   {mode:<15} p50 {result['p50_us']:>9.1f}us  p95 {result['p95_us']:>9.1f}us  "
+              f"hit@{TOP_K} {result['hit_rate']}")
+    return report
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict, baseline: Dict) -> None:
+    """Print latency ratios and top-k overlap against an earlier run"""
+    print(f"\n🔁 Against baseline {baseline.get('commit')}:")
+    for size, report in current["sizes"].items():
+        before = baseline.get("sizes", {}).get(size)
+        if not before:
+            continue
+        for mode, result in report["modes"].items():
+            then = before["modes"].get(mode)
+            if not then:
+                continue
+            overlap = float(np.mean([jaccard(a, b) for a, b in zip(result["top_ids"], then["top_ids"])]))
+            result["baseline_overlap"] = round(overlap, 4)
+            ratio = result["p50_us"] / then["p50_us"] if then["p50_us"] else float("nan")
+            print(f"   {size:>8} {mode:<15} p50 x{ratio:.2f}  top-{TOP_K} overlap {overlap:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval on synthetic knowledge bases")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated section counts")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated, from {', '.join(MODES)}")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Save the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON from another commit to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    print("=" * 60)
+    print("⏱️ Retrieval benchmark")
+    print("=" * 60)
+
+    results = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "settings": {"modes": modes, "queries": args.queries, "seed": args.seed, "top_k": TOP_K},
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            results["sizes"][str(size)] = bench_size(size, args.queries, modes, args.seed, workdir)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        print(f"\n💾 Saved: {args.out}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+End-to-end load test for the RAG server
+Replays voice-style questions against /rag/chat/completions and /chat/completions at a
+fixed concurrency or arrival rate and reports time to the waiting chunk, time to the
+first LLM token, total stream time, throughput and p50/p95/p99.
+
+By default the server runs in-process with the mock LLM (mock_llm.py), so the numbers
+are this server's own overhead plus a known, fixed LLM profile and need no network:
+
+    python benchmark.py --requests 200 --concurrency 20
+    python benchmark.py --rate 50 --duration 30 --profile instant --out bench.json
+    python benchmark.py --baseline bench.json          # exit 1 on a p95 regression
+    python benchmark.py --url http://localhost:8000    # against a running server
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+ENDPOINTS = {"rag": "/rag/chat/completions", "chat": "/chat/completions"}
+METRICS = ("waiting_ms", "first_token_ms", "total_ms")
+PERCENTILES = (50, 95, 99)
+
+def load_queries(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+# ==========================
+# IN-PROCESS SERVER
+# ==========================
+class InProcessServer:
+    """rag_server.app on a local port, answering from the mock LLM"""
+
+    def __init__(self, profile, response_cache: bool):
+        import uvicorn
+        import rag_server
+        from llm_client import LLMClientManager
+        from mock_llm import MockLLMTransport
+
+        rag_server.llm_clients = LLMClientManager(
+            api_key="mock",
+            base_url="http://mock-llm/v1",
+            transport=MockLLMTransport(profile)
+        )
+        rag_server.RESPONSE_CACHE_ENABLED = response_cache
+        logging.getLogger().setLevel(logging.WARNING)
+
+        self.server = uvicorn.Server(uvicorn.Config(
+            rag_server.app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("In-process server failed to start")
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+# ==========================
+# LOAD GENERATION
+# ==========================
+async def run_one(client: httpx.AsyncClient, url: str, query: str) -> Dict:
+    """Stream one completion and time its milestones (ms from sending the request)"""
+    result: Dict = {"ok": False, "waiting_ms": None, "first_token_ms": None, "total_ms": None, "server": None}
+    started = time.perf_counter()
+    body = {"messages": [{"role": "user", "content": query}], "stream": True}
+    try:
+        async with client.stream("POST", url, json=body) as response:
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                now = (time.perf_counter() - started) * 1000
+                if line.startswith(": timings "):
+                    result["server"] = json.loads(line[len(": timings "):])
+                    continue
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    if line == "data: [DONE]":
+                        result["ok"] = True
+                    continue
+                chunk = json.loads(line[len("data: "):])
+                if chunk.get("id") == "error_msg" or "error" in chunk:
+                    result["error"] = "error chunk"
+                    continue
+                if chunk.get("id") == "waiting_msg":
+                    result["waiting_ms"] = now
+                    continue
+                choices = chunk.get("choices") or [{}]
+                if result["first_token_ms"] is None and (choices[0].get("delta") or {}).get("content"):
+                    result["first_token_ms"] = now
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    result["total_ms"] = (time.perf_counter() - started) * 1000
+    if "error" in result:
+        result["ok"] = False
+    return result
+
+async def run_load(
+    base_url: str,
+    endpoint: str,
+    queries: List[str],
+    requests: int,
+    concurrency: int,
+    rate: Optional[float],
+    duration: Optional[float],
+    seed: int
+) -> Dict:
+    """Closed loop (concurrency) or open loop (Poisson arrivals at `rate` per second)"""
+    rng = random.Random(seed)
+    url = base_url.rstrip('/') + ENDPOINTS[endpoint]
+    results: List[Dict] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+
+        if rate:
+            tasks = []
+            deadline = started + duration if duration else None
+            while (deadline is None and len(tasks) < requests) or (deadline is not None and time.perf_counter() < deadline):
+                tasks.append(asyncio.create_task(run_one(client, url, rng.choice(queries))))
+                await asyncio.sleep(rng.expovariate(rate))
+            results = await asyncio.gather(*tasks)
+        else:
+            # Workers share one iterator of request slots; with a duration it never runs out
+            remaining = iter(int, 1) if duration else iter(range(requests))
+            stop_at = started + duration if duration else None
+
+            async def worker():
+                for _ in remaining:
+                    if stop_at is not None and time.perf_counter() >= stop_at:
+                        return
+                    results.append(await run_one(client, url, rng.choice(queries)))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        elapsed = time.perf_counter() - started
+
+    return summarize(results, elapsed)
+
+# ==========================
+# REPORTING
+# ==========================
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    points = np.percentile(np.array(values), PERCENTILES)
+    report = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+    report["mean"] = round(float(np.mean(values)), 2)
+    return report
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    ok = [r for r in results if r["ok"]]
+    summary: Dict = {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+    }
+    for metric in METRICS:
+        summary[metric] = percentiles([r[metric] for r in ok if r[metric] is not None])
+
+    # Server-side stage timings reported by the RAG endpoint
+    server = [r["server"] for r in ok if r["server"]]
+    if server:
+        stages = sorted({name for s in server for name in s["stages"]})
+        marks = sorted({name for s in server for name in s["marks"]})
+        summary["server"] = {
+            "stages_ms": {name: percentiles([s["stages"][name]["ms"] for s in server if name in s["stages"]]) for name in stages},
+            "marks_ms": {name: percentiles([s["marks"][name] for s in server if name in s["marks"]]) for name in marks},
+        }
+    return summary
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """p95 metrics more than `tolerance` (a fraction) slower than the baseline"""
+    regressions = []
+    for endpoint, summary in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        for metric in METRICS:
+            now, then = summary.get(metric), before.get(metric)
+            if now and then and then["p95"] > 0 and now["p95"] > then["p95"] * (1 + tolerance):
+                regressions.append(f"{endpoint} {metric} p95 {then['p95']:.1f}ms -> {now['p95']:.1f}ms")
+        if before["errors"] == 0 and summary["errors"] > 0:
+            regressions.append(f"{endpoint} errors 0 -> {summary['errors']}")
+    return regressions
+
+def print_summary(endpoint: str, summary: Dict):
+    print(f"\n📊 {endpoint}: {summary['ok']}/{summary['requests']} ok, "
+          f"{summary['throughput_rps']} req/s over {summary['elapsed_s']}s")
+    for metric in METRICS:
+        values = summary[metric]
+        if values:
+            print(f"   {metric:<15} p50 {values['p50']:>8.1f}  p95 {values['p95']:>8.1f}  p99 {values['p99']:>8.1f}")
+    if "server" in summary:
+        prepared = summary["server"]["marks_ms"].get("prepared")
+        if prepared:
+            print(f"   {'server prepared':<15} p50 {prepared['p50']:>8.1f}  p95 {prepared['p95']:>8.1f}  p99 {prepared['p99']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG server")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process with the mock LLM)")
+    parser.add_argument("--endpoint", choices=["rag", "chat", "both"], default="both")
+    parser.add_argument("--queries", default="./benchmark_queries.txt", help="One question per line")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent callers (closed loop)")
+    parser.add_argument("--rate", type=float, help="Arrivals per second instead (open loop, Poisson)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of --requests")
+    parser.add_argument("--profile", default="groq", help="Mock LLM profile (instant, groq, slow, flaky)")
+    parser.add_argument("--ttft-ms", type=float, help="Override the profile's time to first token")
+    parser.add_argument("--token-ms", type=float, help="Override the profile's delay between tokens")
+    parser.add_argument("--tokens", type=int, help="Override the profile's answer length")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the answer cache on (in-process)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Save the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 slowdown vs baseline")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    endpoints = ["rag", "chat"] if args.endpoint == "both" else [args.endpoint]
+
+    print("=" * 60)
+    print("🏁 RAG server benchmark")
+    print("=" * 60)
+
+    results = {
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        "endpoints": {},
+    }
+
+    def run_all(base_url: str):
+        for endpoint in endpoints:
+            results["endpoints"][endpoint] = asyncio.run(run_load(
+                base_url, endpoint, queries, args.requests, args.concurrency,
+                args.rate, args.duration, args.seed
+            ))
+            print_summary(endpoint, results["endpoints"][endpoint])
+
+    if args.url:
+        print(f"🎯 Target: {args.url}")
+        run_all(args.url)
+    else:
+        from mock_llm import get_profile
+
+        profile = get_profile(
+            args.profile, ttft_ms=args.ttft_ms, token_ms=args.token_ms, tokens=args.tokens, seed=args.seed
+        )
+        results["settings"]["mock_llm"] = profile.to_dict()
+        print(f"🧪 In-process server, mock LLM: {args.profile} {profile.to_dict()}")
+        with InProcessServer(profile, response_cache=args.response_cache) as base_url:
+            run_all(base_url)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved: {args.out}")
+
+    print("=" * 60)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print("❌ Regressions against the baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ No p95 regression beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
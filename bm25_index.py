@@ -0,0 +1,106 @@
+"""
+BM25 ranking over knowledge base sections
+Term statistics are precomputed into flat NumPy arrays when the index is built
+"""
+
+from typing import Dict, List, Tuple
+from collections import Counter
+import logging
+import numpy as np
+
+from inverted_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+class BM25Index:
+    """
+    Okapi BM25 over whole-word tokens
+
+    Postings are stored CSR-style: the postings of term t live in
+    doc_ids[offsets[t]:offsets[t + 1]] with their precomputed BM25 weights in
+    weights[...], so scoring a query is a weighted bincount over a few slices.
+    """
+
+    def __init__(self, sections: List[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_sections = len(sections)
+
+        term_counts = [Counter(tokenize(section)) for section in sections]
+        self.doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        self.avg_doc_length = float(self.doc_lengths.mean()) if self.num_sections else 0.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for section_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((section_id, tf))
+
+        self.vocabulary: Dict[str, int] = {term: term_id for term_id, term in enumerate(postings)}
+        self.doc_freqs = np.array([len(postings[term]) for term in postings], dtype=np.int32)
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum(self.doc_freqs, out=self.offsets[1:])
+
+        self.doc_ids = np.empty(int(self.offsets[-1]), dtype=np.int32)
+        term_freqs = np.empty(int(self.offsets[-1]), dtype=np.float32)
+        for term, term_id in self.vocabulary.items():
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            ids, tfs = zip(*postings[term])
+            self.doc_ids[start:end] = ids
+            term_freqs[start:end] = tfs
+
+        # BM25 IDF, floored at zero so very common terms never penalise a section
+        n = self.num_sections
+        self.idf = np.maximum(
+            np.log((n - self.doc_freqs + 0.5) / (self.doc_freqs + 0.5) + 1.0), 0.0
+        ).astype(np.float32)
+
+        # Fold IDF and length normalisation into one weight per posting
+        if self.avg_doc_length > 0:
+            length_norm = k1 * (1 - b + b * self.doc_lengths[self.doc_ids] / self.avg_doc_length)
+        else:
+            length_norm = np.full(len(self.doc_ids), k1, dtype=np.float32)
+        term_ids = np.repeat(np.arange(len(self.vocabulary), dtype=np.int32), self.doc_freqs)
+        self.weights = (self.idf[term_ids] * term_freqs * (k1 + 1) / (term_freqs + length_norm)).astype(np.float32)
+
+        logger.info(
+            f"📊 Built BM25 index: {len(self.vocabulary)} terms, "
+            f"{len(self.doc_ids)} postings, avg section length {self.avg_doc_length:.1f}"
+        )
+
+    def score_all(self, query: str) -> np.ndarray:
+        """BM25 score of every section for the query"""
+        query_terms = Counter(term for term in tokenize(query) if term in self.vocabulary)
+        if not query_terms:
+            return np.zeros(self.num_sections, dtype=np.float32)
+
+        slices_ids = []
+        slices_weights = []
+        for term, query_tf in query_terms.items():
+            term_id = self.vocabulary[term]
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            slices_ids.append(self.doc_ids[start:end])
+            slices_weights.append(self.weights[start:end] * query_tf)
+
+        return np.bincount(
+            np.concatenate(slices_ids),
+            weights=np.concatenate(slices_weights),
+            minlength=self.num_sections
+        ).astype(np.float32)
+
+    def score(self, query: str, top_k: int = 4) -> List[Tuple[float, int]]:
+        """
+        Top-k (score, section_id) pairs with a positive score, best first
+        Ties keep document order
+        """
+        scores = self.score_all(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) == 0:
+            return []
+
+        if len(matched) > top_k:
+            # Keep every section tied with the k-th score so ties resolve by document order
+            kth = np.partition(scores[matched], len(matched) - top_k)[len(matched) - top_k]
+            matched = matched[scores[matched] >= kth]
+
+        order = np.lexsort((matched, -scores[matched]))[:top_k]
+        return [(float(scores[matched[i]]), int(matched[i])) for i in order]
@@ -0,0 +1,62 @@
+"""
+Precompute section embeddings for vector retrieval
+Writes a float32 .npy matrix (plus .meta.json) that rag_server.py memory-maps at startup
+
+Usage:
+    python build_embeddings.py
+    python build_embeddings.py --kb my_city_info.txt --out kb_embeddings.npy --embedder local:./models/all-MiniLM-L6-v2
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from embedders import get_embedder
+from knowledge_base import KnowledgeBase, load_knowledge_base
+from vector_index import embed_sections, save_embeddings, meta_path_for
+from chunker import CHUNKING_MODES, DEFAULT_CHUNKING, DEFAULT_MAX_CHUNK_CHARS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute knowledge base section embeddings")
+    parser.add_argument("--kb", default="./my_city_info.txt", help="Knowledge base text file")
+    parser.add_argument("--out", default="./kb_embeddings.npy", help="Output .npy file")
+    parser.add_argument("--embedder", default="hashing",
+                        help='"hashing", "hashing:<dim>" or "local:<model path>"')
+    parser.add_argument("--chunking", default=DEFAULT_CHUNKING, choices=CHUNKING_MODES,
+                        help="Chunking mode (CHUNKING in rag_server.py)")
+    parser.add_argument("--max-chunk-chars", type=int, default=DEFAULT_MAX_CHUNK_CHARS,
+                        help="Maximum chunk size (MAX_CHUNK_CHARS in rag_server.py)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    print("=" * 60)
+    print("🧮 Building section embeddings")
+    print("=" * 60)
+
+    text = load_knowledge_base(args.kb)
+    if not text:
+        print(f"❌ Knowledge base is empty or missing: {args.kb}")
+        sys.exit(1)
+
+    knowledge_base = KnowledgeBase(
+        text, path=args.kb, chunking=args.chunking, max_chunk_chars=args.max_chunk_chars
+    )
+    embedder = get_embedder(args.embedder)
+    print(f"📚 Knowledge base: {args.kb} ({len(knowledge_base)} sections)")
+    print(f"🔤 Embedder: {embedder.name} ({embedder.dim} dims)")
+
+    started = time.perf_counter()
+    matrix = embed_sections(knowledge_base.sections, embedder)
+    save_embeddings(args.out, matrix, embedder.name, knowledge_base.version)
+
+    print(f"✅ Embedded {matrix.shape[0]} sections in {time.perf_counter() - started:.2f}s")
+    print(f"💾 Saved: {args.out} ({matrix.nbytes} bytes)")
+    print(f"💾 Saved: {meta_path_for(args.out)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
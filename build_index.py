@@ -0,0 +1,77 @@
+"""
+Build the binary knowledge base index offline
+Writes one memory-mappable file with the sections, keyword postings, BM25 arrays and
+(optionally) section embeddings; rag_server.py opens it instead of indexing the text
+
+Usage:
+    python build_index.py
+    python build_index.py --kb my_city_info.txt --out kb_index.bin --embedder hashing
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from embedders import get_embedder
+from knowledge_base import KnowledgeBase, load_knowledge_base
+from keyword_matcher import load_keyword_table
+from vector_index import embed_sections
+from index_file import write_index_file
+from chunker import CHUNKING_MODES, DEFAULT_CHUNKING, DEFAULT_MAX_CHUNK_CHARS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped knowledge base index")
+    parser.add_argument("--kb", default="./my_city_info.txt", help="Knowledge base text file")
+    parser.add_argument("--keywords", default="./location_keywords.json", help="Category synonyms table")
+    parser.add_argument("--out", default="./kb_index.bin", help="Output index file")
+    parser.add_argument("--embedder", default=None,
+                        help='Also store embeddings: "hashing", "hashing:<dim>" or "local:<model path>"')
+    parser.add_argument("--chunking", default=DEFAULT_CHUNKING, choices=CHUNKING_MODES,
+                        help="Chunking mode (CHUNKING in rag_server.py)")
+    parser.add_argument("--max-chunk-chars", type=int, default=DEFAULT_MAX_CHUNK_CHARS,
+                        help="Maximum chunk size (MAX_CHUNK_CHARS in rag_server.py)")
+    parser.add_argument("--whole-words", action="store_true",
+                        help="Match keywords as whole words (KEYWORD_SUBSTRING_COMPAT = False)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    print("=" * 60)
+    print("🗂️ Building knowledge base index")
+    print("=" * 60)
+
+    text = load_knowledge_base(args.kb)
+    if not text:
+        print(f"❌ Knowledge base is empty or missing: {args.kb}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    knowledge_base = KnowledgeBase(
+        text,
+        path=args.kb,
+        keyword_table=load_keyword_table(args.keywords),
+        substring_compat=not args.whole_words,
+        chunking=args.chunking,
+        max_chunk_chars=args.max_chunk_chars
+    )
+    print(f"📚 Knowledge base: {args.kb} ({len(knowledge_base)} {args.chunking} chunks, version {knowledge_base.version})")
+
+    embeddings = None
+    embedder_name = None
+    if args.embedder:
+        embedder = get_embedder(args.embedder)
+        embedder_name = embedder.name
+        print(f"🔤 Embedder: {embedder.name} ({embedder.dim} dims)")
+        embeddings = embed_sections(knowledge_base.sections, embedder)
+
+    size = write_index_file(args.out, knowledge_base, embeddings=embeddings, embedder_name=embedder_name)
+
+    print(f"✅ Indexed {len(knowledge_base)} sections in {time.perf_counter() - started:.2f}s")
+    print(f"💾 Saved: {args.out} ({size} bytes)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Structure-aware chunking for knowledge base files
+Blocks are still separated by blank lines, but headings become context carried into
+every chunk below them instead of chunks of their own, Q&A pairs and key/value
+entries ("Location:", "Hours:") stay whole, and oversized blocks are split to a
+maximum size with their title repeated
+"""
+
+from typing import List, Optional, Tuple
+import re
+import logging
+
+from faq_fast_path import parse_faq_section
+
+logger = logging.getLogger(__name__)
+
+# "blank_lines" is the original one-chunk-per-paragraph split
+CHUNKING_MODES = ("structured", "blank_lines")
+DEFAULT_CHUNKING = "structured"
+DEFAULT_MAX_CHUNK_CHARS = 800
+
+MAX_HEADING_CHARS = 60
+MARKDOWN_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+)$")
+FIELD_PATTERN = re.compile(r"^[A-Z][\w &/'-]{0,30}:\s")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+class Chunk:
+    """A retrievable piece of the knowledge base: its body plus the headings above it"""
+
+    def __init__(self, body: str, context: str = "", kind: str = "text"):
+        self.body = body
+        self.context = context
+        self.kind = kind
+
+    @property
+    def text(self) -> str:
+        """What gets indexed and sent to the LLM"""
+        return f"[{self.context}]\n{self.body}" if self.context else self.body
+
+def is_heading(block: str) -> bool:
+    """A short single line that is not a sentence, question or field"""
+    return (
+        '\n' not in block
+        and len(block) <= MAX_HEADING_CHARS
+        and not block.endswith(('.', '?', '!', ':'))
+        and not FIELD_PATTERN.match(block)
+    )
+
+def block_kind(block: str) -> str:
+    """"faq", "entry" (key/value fields) or "text" """
+    if parse_faq_section(block):
+        return "faq"
+    if any(FIELD_PATTERN.match(line) for line in block.split('\n')[1:]):
+        return "entry"
+    return "text"
+
+def block_title(lines: List[str]) -> Optional[str]:
+    """First line of a multi-line block when it reads like a title"""
+    if len(lines) > 1 and is_heading(lines[0].strip()):
+        return lines[0]
+    return None
+
+def split_words(text: str, max_chars: int) -> List[str]:
+    """Hard-wrap text that has no usable sentence boundaries"""
+    pieces, current = [], ""
+    for word in text.split(' '):
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_block(block: str, max_chars: int) -> List[str]:
+    """
+    Split a block into parts of at most max_chars, at line, then sentence, then word boundaries
+    The block's title line, if any, is repeated at the top of every part.
+    """
+    if len(block) <= max_chars:
+        return [block]
+
+    lines = block.split('\n')
+    title = block_title(lines)
+    if title is not None:
+        lines = lines[1:]
+    budget = max(max_chars - (len(title) + 1 if title else 0), 1)
+
+    # (piece, separator to the previous piece)
+    units: List[Tuple[str, str]] = []
+    for line in lines:
+        pieces = [line] if len(line) <= budget else [
+            piece
+            for sentence in SENTENCE_PATTERN.split(line)
+            for piece in ([sentence] if len(sentence) <= budget else split_words(sentence, budget))
+        ]
+        units.extend((piece, '\n' if i == 0 else ' ') for i, piece in enumerate(pieces))
+
+    parts, current = [], ""
+    for piece, separator in units:
+        if current and len(current) + 1 + len(piece) > budget:
+            parts.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        parts.append(current)
+
+    return [f"{title}\n{part}" if title else part for part in parts]
+
+def chunk_text(
+    text: str,
+    mode: str = DEFAULT_CHUNKING,
+    max_chars: int = DEFAULT_MAX_CHUNK_CHARS
+) -> List[Chunk]:
+    """Split knowledge base text into chunks"""
+    if mode not in CHUNKING_MODES:
+        raise ValueError(f"Unknown chunking mode: {mode}")
+
+    blocks = text.split('\n\n') if text else []
+    if mode == "blank_lines":
+        return [Chunk(block) for block in blocks]
+
+    chunks: List[Chunk] = []
+    headings: List[Tuple[int, str]] = []  # (level, title) path to the current block
+    heading_has_content = True
+
+    for block in blocks:
+        block = block.strip()
+        if not block:
+            continue
+
+        markdown = MARKDOWN_HEADING_PATTERN.match(block) if '\n' not in block else None
+        if markdown or is_heading(block):
+            if markdown:
+                level, title = len(markdown.group(1)), markdown.group(2).strip()
+            elif headings and not heading_has_content:
+                # Consecutive plain headings nest: "Guide" then "Ground Floor"
+                level, title = headings[-1][0] + 1, block
+            else:
+                level, title = (headings[-1][0] if headings else 1), block
+
+            if headings and not heading_has_content and level <= headings[-1][0]:
+                # Replaced before any content used it; keep its text searchable
+                chunks.append(Chunk(headings[-1][1], " > ".join(t for _, t in headings[:-1]), "heading"))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, title))
+            heading_has_content = False
+            continue
+
+        context = " > ".join(title for _, title in headings)
+        kind = block_kind(block)
+        context_chars = len(context) + 3 if context else 0  # "[context]\n"
+        parts = [block] if kind == "faq" else split_block(block, max(max_chars - context_chars, max_chars // 2))
+        chunks.extend(Chunk(part, context, kind) for part in parts)
+        heading_has_content = True
+
+    if headings and not heading_has_content:
+        chunks.append(Chunk(headings[-1][1], " > ".join(t for _, t in headings[:-1]), "heading"))
+
+    logger.info(f"✂️ Chunked {len(blocks)} blocks into {len(chunks)} chunks (max {max_chars} chars)")
+    return chunks
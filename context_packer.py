@@ -0,0 +1,183 @@
+"""
+Token-budgeted prompt packing for the RAG system prompt
+Fits the best-ranked sections and the most recent conversation turns into a fixed
+prompt budget, counted with a local tokenizer, and reports what was kept
+"""
+
+from typing import Callable, Dict, List, Tuple
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chat formats add a few tokens per message for the role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+# Older turns are cut down rather than dropped while at least this much room is left
+MIN_TRUNCATED_TOKENS = 16
+TRUNCATION_MARK = " …"
+
+APPROX_TOKEN_PATTERN = re.compile(r"\w{1,6}|[^\w\s]")
+
+class ApproximateTokenizer:
+    """
+    Dependency-free token estimate: one token per punctuation mark and per
+    started 6 characters of a word, which tracks Llama-style BPE counts on English
+    """
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return len(APPROX_TOKEN_PATTERN.findall(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of the text that is at most max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        for i, match in enumerate(APPROX_TOKEN_PATTERN.finditer(text)):
+            if i == max_tokens - 1:
+                return text[:match.end()]
+        return text
+
+class HuggingFaceTokenizer:
+    """
+    Exact counts from a local tokenizer.json (e.g. the one shipped with the served model)
+    The file must already be on disk; nothing is downloaded.
+    """
+
+    def __init__(self, tokenizer_path: str):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("Local tokenizer requires: pip install tokenizers")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.name = f"hf:{tokenizer_path}"
+        logger.info(f"✅ Loaded local tokenizer: {tokenizer_path}")
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        offsets = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:offsets[max_tokens - 1][1]]
+
+def get_tokenizer(spec: str):
+    """
+    Build a tokenizer from a config string
+    "approx"                     -> ApproximateTokenizer
+    "hf:<path to tokenizer.json>" -> HuggingFaceTokenizer
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "approx":
+        return ApproximateTokenizer()
+    if kind == "hf" and arg:
+        return HuggingFaceTokenizer(arg)
+    raise ValueError(f"Unknown tokenizer: {spec}")
+
+class ContextPacker:
+    """
+    Builds the message list for one turn within `budget` prompt tokens
+
+    The system prompt and the latest user message always go in (the latter truncated
+    if it alone is too long). Up to `history_tokens` are held back for earlier turns;
+    sections fill the rest in rank order, skipping any that no longer fit, and the
+    first one is truncated rather than dropped. Earlier turns then take the room that
+    is left, newest first; the oldest that still partly fits is truncated.
+    """
+
+    def __init__(self, tokenizer, budget: int = 2000, history_tokens: int = 500):
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.history_tokens = history_tokens
+
+    def message_tokens(self, content: str) -> int:
+        return self.tokenizer.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        mark_tokens = self.tokenizer.count(TRUNCATION_MARK)
+        return self.tokenizer.truncate(text, max_tokens - mark_tokens).rstrip() + TRUNCATION_MARK
+
+    def pack(
+        self,
+        sections: List[str],
+        turns: List[Dict[str, str]],
+        system_prompt: Callable[[str], str]
+    ) -> Tuple[List[Dict[str, str]], Dict]:
+        """
+        Pack ranked sections and conversation turns (oldest first, ending with the
+        user's question) into messages; returns them with a report of what was kept
+        """
+        report = {
+            "tokenizer": self.tokenizer.name,
+            "budget": self.budget,
+            "sections_used": 0,
+            "sections_truncated": 0,
+            "sections_dropped": 0,
+            "turns_used": 0,
+            "turns_truncated": 0,
+            "turns_dropped": 0,
+        }
+
+        # The system prompt with no context, plus the question, are always sent
+        fixed_tokens = self.message_tokens(system_prompt(""))
+        latest = dict(turns[-1]) if turns else None
+        if latest is not None:
+            room = self.budget - fixed_tokens - MESSAGE_OVERHEAD_TOKENS
+            if self.tokenizer.count(latest["content"]) > room:
+                latest["content"] = self.truncate(latest["content"], max(room, MIN_TRUNCATED_TOKENS))
+                report["turns_truncated"] += 1
+            fixed_tokens += self.message_tokens(latest["content"])
+
+        earlier = turns[:-1]
+        earlier_tokens = sum(self.message_tokens(turn["content"]) for turn in earlier)
+        remaining = self.budget - fixed_tokens
+
+        # Sections, best first, within what is not held back for earlier turns
+        context_room = remaining - min(earlier_tokens, self.history_tokens)
+        kept_sections = []
+        context_tokens = 0
+        separator_tokens = self.tokenizer.count("\n\n")
+        for section in sections:
+            cost = self.tokenizer.count(section) + (separator_tokens if kept_sections else 0)
+            if context_tokens + cost <= context_room:
+                kept_sections.append(section)
+                context_tokens += cost
+            elif not kept_sections and context_room >= MIN_TRUNCATED_TOKENS:
+                kept_sections.append(self.truncate(section, context_room))
+                context_tokens += self.tokenizer.count(kept_sections[-1])
+                report["sections_truncated"] += 1
+            else:
+                report["sections_dropped"] += 1
+        report["sections_used"] = len(kept_sections)
+        remaining -= context_tokens
+
+        # Earlier turns, newest first, in whatever room is left
+        kept_turns = []
+        for turn in reversed(earlier):
+            cost = self.message_tokens(turn["content"])
+            if cost <= remaining:
+                kept_turns.append(turn)
+                remaining -= cost
+            elif remaining - MESSAGE_OVERHEAD_TOKENS >= MIN_TRUNCATED_TOKENS:
+                content = self.truncate(turn["content"], remaining - MESSAGE_OVERHEAD_TOKENS)
+                kept_turns.append({"role": turn["role"], "content": content})
+                remaining -= self.message_tokens(content)
+                report["turns_truncated"] += 1
+            else:
+                report["turns_dropped"] += 1
+        kept_turns.reverse()
+
+        context = "\n\n".join(kept_sections)
+        messages = [{"role": "system", "content": system_prompt(context)}]
+        messages.extend(kept_turns)
+        if latest is not None:
+            messages.append(latest)
+
+        report["turns_used"] = len(kept_turns) + (1 if latest is not None else 0)
+        report["context_tokens"] = context_tokens
+        report["tokens"] = sum(self.message_tokens(message["content"]) for message in messages)
+        return messages, report
@@ -47,7 +47,7 @@ def check_file(filepath):
 
 
 def check_server():
-    """Check if RAG server is running"""
+    """Check if RAG server is running; returns its health report"""
     print("\n🌐 Checking RAG server...")
 
     try:
@@ -59,7 +59,8 @@ def check_server():
             print(f"   Knowledge base loaded: {data.get('knowledge_base_loaded')}")
             print(f"   Knowledge base size: {data.get('knowledge_base_size')} bytes")
             print(f"   Groq API configured: {data.get('groq_api_configured')}")
-            return True
+            print(f"   LLM backend: {data.get('llm_backend', 'groq')}")
+            return data
         else:
             print(f"❌ Server responded with status: {response.status_code}")
             return False
@@ -215,15 +216,19 @@ def main():
 
     # Check 2: Server running
     print_section("Check 2: RAG Server Status")
-    if not check_server():
+    health = check_server()
+    if not health:
         issues.append("RAG server not running or not responding")
         print("\n⚠️ Cannot continue without server. Start it with:")
         print("   python rag_server.py")
         sys.exit(1)
 
-    # Check 3: Groq API key
+    # Check 3: Groq API key (not needed when the server uses the mock or another backend)
     print_section("Check 3: Groq API Key")
-    if not check_groq_key():
+    backend = health.get("llm_backend", "groq")
+    if backend != "groq":
+        print(f"⏭️ Skipped: the server uses LLM_BACKEND = \"{backend}\"")
+    elif not check_groq_key():
         issues.append("Groq API key issue")
 
     # Check 4: Test query
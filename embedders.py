@@ -0,0 +1,92 @@
+"""
+Text embedders for vector retrieval
+Every embedder runs locally on the CPU and returns L2-normalised float32 rows
+"""
+
+from typing import List
+import os
+import zlib
+import logging
+import numpy as np
+
+from inverted_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise each row, leaving all-zero rows at zero"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder (no model, no network)
+    Hashes word tokens and character trigrams into a signed bag-of-features vector.
+    Stable across processes, so it doubles as a stand-in for tests and benchmarks.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in tokenize(text):
+            features.append(token)
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a (len(texts), dim) matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode('utf-8'))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return normalize_rows(matrix)
+
+class SentenceTransformerEmbedder:
+    """
+    Local sentence-transformers model pinned to the CPU
+    The model must already be on disk; the Hugging Face hub is never contacted.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 32):
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("Local embedding model requires: pip install sentence-transformers")
+
+        self.model = SentenceTransformer(model_path, device="cpu")
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"local:{model_path}"
+        logger.info(f"✅ Loaded local embedding model: {model_path} ({self.dim} dims)")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a (len(texts), dim) matrix"""
+        matrix = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(matrix, dtype=np.float32)
+
+def get_embedder(spec: str):
+    """
+    Build an embedder from a config string
+    "hashing" or "hashing:<dim>" -> HashingEmbedder
+    "local:<model path>"         -> SentenceTransformerEmbedder
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(dim=int(arg) if arg else 384)
+    if kind == "local" and arg:
+        return SentenceTransformerEmbedder(arg)
+    raise ValueError(f"Unknown embedder: {spec}")
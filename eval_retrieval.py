@@ -0,0 +1,256 @@
+"""
+Offline retrieval evaluation against labelled queries
+Scores each retrieval mode on eval_queries.json (queries with the section IDs that
+answer them): recall@k, MRR and per-query latency. With --baseline it lists every
+metric that dropped and every query that lost its answer, and exits with an error,
+so keyword table or scoring changes can be checked before they ship. Latency is the
+median over several timing passes, and slowdowns under --min-slowdown-ms are ignored,
+so microsecond-scale noise does not fail the gate.
+
+Usage:
+    python eval_retrieval.py --out eval_baseline.json
+    python eval_retrieval.py --keywords tuned_keywords.json --baseline eval_baseline.json
+    python eval_retrieval.py --list-sections      # section IDs, for writing labels
+"""
+
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+from knowledge_base import KnowledgeBase, rank_sections, text_version, load_knowledge_base
+from keyword_matcher import load_keyword_table
+from embedders import get_embedder
+from hybrid import hybrid_rank
+
+MODES = ("keyword", "bm25", "vector", "hybrid")
+RECALL_AT = (1, 4, 10)  # 4 is TOP_K, what the LLM actually sees
+TOP_K = 4
+
+def load_labels(path: str) -> Dict:
+    """The labelled query file: knowledge base settings plus [{"query", "expected"}]"""
+    with open(path, 'r', encoding='utf-8') as f:
+        labels = json.load(f)
+    for i, item in enumerate(labels.get("queries", [])):
+        if not item.get("query") or not item.get("expected"):
+            raise ValueError(f"Labelled query {i} needs a query and at least one expected section ID")
+    return labels
+
+def build_knowledge_base(labels: Dict, kb_path: str, keywords_path: str, substring_compat: bool) -> KnowledgeBase:
+    text = load_knowledge_base(kb_path)
+    chunking = labels.get("chunking", "structured")
+    max_chunk_chars = labels.get("max_chunk_chars", 800)
+    if labels.get("version") and text_version(text, chunking, max_chunk_chars) != labels["version"]:
+        print(f"⚠️ {kb_path} changed since the labels were written; check the section IDs with --list-sections")
+    return KnowledgeBase(
+        text,
+        path=kb_path,
+        keyword_table=load_keyword_table(keywords_path),
+        substring_compat=substring_compat,
+        chunking=chunking,
+        max_chunk_chars=max_chunk_chars
+    )
+
+# ==========================
+# METRICS
+# ==========================
+def recall_at(ranked_ids: List[int], expected: List[int], k: int) -> float:
+    return len(set(ranked_ids[:k]) & set(expected)) / len(expected)
+
+def reciprocal_rank(ranked_ids: List[int], expected: List[int]) -> float:
+    for rank, section_id in enumerate(ranked_ids, start=1):
+        if section_id in expected:
+            return 1.0 / rank
+    return 0.0
+
+def evaluate_mode(
+    knowledge_base: KnowledgeBase,
+    mode: str,
+    queries: List[Dict],
+    repeat: int,
+    hybrid_retrievers: List[str]
+) -> Dict:
+    """
+    Quality over all queries, and latency from `repeat` timing passes over all of them
+    Each pass yields its own p50/p95/mean; the reported figures are the medians across
+    passes, and each query's latency is the median of its runs.
+    """
+    depth = max(RECALL_AT)
+    loop = asyncio.new_event_loop() if mode == "hybrid" else None
+
+    def rank(query: str) -> List[Tuple[float, int]]:
+        if loop is not None:
+            ranked, _ = loop.run_until_complete(hybrid_rank(
+                query, knowledge_base, hybrid_retrievers, budget_ms=10_000, top_k=depth, depth=depth
+            ))
+            return ranked
+        return rank_sections(query, knowledge_base, mode, depth)
+
+    try:
+        rank(queries[0]["query"])  # Warm-up (lazy indexes, thread pool)
+        timings = np.zeros((repeat, len(queries)))
+        rankings = []
+        for run in range(repeat):
+            rankings = []
+            for position, item in enumerate(queries):
+                started = time.perf_counter()
+                rankings.append(rank(item["query"]))
+                timings[run, position] = (time.perf_counter() - started) * 1e6
+
+        per_query = []
+        for position, (item, ranked) in enumerate(zip(queries, rankings)):
+            ranked_ids = [section_id for _, section_id in ranked]
+            per_query.append({
+                "query": item["query"],
+                "expected": item["expected"],
+                "top": ranked_ids[:TOP_K],
+                "first_hit": next((rank for rank, i in enumerate(ranked_ids, start=1) if i in item["expected"]), None),
+                "recall": {f"@{k}": recall_at(ranked_ids, item["expected"], k) for k in RECALL_AT},
+                "rr": reciprocal_rank(ranked_ids, item["expected"]),
+                "us": round(float(np.median(timings[:, position])), 1),
+            })
+    finally:
+        if loop is not None:
+            loop.close()
+
+    return {
+        "recall": {f"@{k}": round(float(np.mean([q["recall"][f"@{k}"] for q in per_query])), 4) for k in RECALL_AT},
+        "mrr": round(float(np.mean([q["rr"] for q in per_query])), 4),
+        "answered": sum(1 for q in per_query if q["first_hit"] and q["first_hit"] <= TOP_K),
+        "latency_us": {
+            "p50": round(float(np.median(np.percentile(timings, 50, axis=1))), 1),
+            "p95": round(float(np.median(np.percentile(timings, 95, axis=1))), 1),
+            "mean": round(float(np.median(timings.mean(axis=1))), 1),
+        },
+        "queries": per_query,
+    }
+
+# ==========================
+# REPORTING
+# ==========================
+def compare(current: Dict, baseline: Dict, max_drop: float, max_slowdown: float, min_slowdown_ms: float) -> List[str]:
+    """
+    Quality drops beyond max_drop, queries that lost their answer, and p95 slowdowns
+    beyond max_slowdown (relative) that are also at least min_slowdown_ms (absolute)
+    """
+    regressions = []
+    for mode, result in current["modes"].items():
+        before = baseline.get("modes", {}).get(mode)
+        if not before:
+            continue
+        for k, value in result["recall"].items():
+            then = before["recall"].get(k)
+            if then is not None and value < then - max_drop:
+                regressions.append(f"{mode} recall{k} {then:.3f} -> {value:.3f}")
+        if result["mrr"] < before["mrr"] - max_drop:
+            regressions.append(f"{mode} MRR {before['mrr']:.3f} -> {result['mrr']:.3f}")
+
+        answered_before = {
+            q["query"] for q in before["queries"] if q["first_hit"] and q["first_hit"] <= TOP_K
+        }
+        for q in result["queries"]:
+            if q["query"] in answered_before and not (q["first_hit"] and q["first_hit"] <= TOP_K):
+                regressions.append(f"{mode} lost the answer to '{q['query']}' (top {q['top']}, expected {q['expected']})")
+
+        then_p95, now_p95 = before["latency_us"]["p95"], result["latency_us"]["p95"]
+        slowdown = now_p95 - then_p95
+        if slowdown > then_p95 * max_slowdown and slowdown >= min_slowdown_ms * 1000:
+            regressions.append(f"{mode} p95 latency {then_p95:.0f}us -> {now_p95:.0f}us")
+    return regressions
+
+def print_mode(mode: str, result: Dict, total: int):
+    recall = "  ".join(f"R{k} {value:.3f}" for k, value in result["recall"].items())
+    latency = result["latency_us"]
+    print(f"   {mode:<8} {recall}  MRR {result['mrr']:.3f}  answered {result['answered']}/{total}  "
+          f"p50 {latency['p50']:.0f}us  p95 {latency['p95']:.0f}us")
+
+def list_sections(knowledge_base: KnowledgeBase):
+    for section_id, section in enumerate(knowledge_base.sections):
+        print(f"{section_id:>4}  {' | '.join(section.splitlines()[:2])[:100]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency on labelled queries")
+    parser.add_argument("--labels", default="./eval_queries.json", help="Labelled query file")
+    parser.add_argument("--kb", help="Knowledge base text file (default: the one named in the labels)")
+    parser.add_argument("--keywords", default="./location_keywords.json", help="Keyword table to evaluate")
+    parser.add_argument("--no-substring-compat", action="store_true", help="Whole-word keyword matching only")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated, from {', '.join(MODES)}")
+    parser.add_argument("--hybrid", default="keyword,vector", help="Retrievers fused in hybrid mode")
+    parser.add_argument("--embedder", default="hashing", help='"hashing" or "local:<model path>"')
+    parser.add_argument("--embeddings", default="./kb_embeddings.npy", help="Prebuilt embeddings (built in memory if stale)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing passes over all queries (medians are reported)")
+    parser.add_argument("--out", help="Save the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--max-drop", type=float, default=0.0, help="Allowed drop in recall/MRR vs baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.5, help="Allowed relative p95 latency increase vs baseline")
+    parser.add_argument("--min-slowdown-ms", type=float, default=0.2, help="p95 increases below this are noise, never regressions")
+    parser.add_argument("--list-sections", action="store_true", help="Print the section IDs and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    hybrid_retrievers = [mode for mode in args.hybrid.split(",") if mode]
+
+    labels = load_labels(args.labels)
+    kb_path = args.kb or labels.get("knowledge_base", "./my_city_info.txt")
+    knowledge_base = build_knowledge_base(labels, kb_path, args.keywords, not args.no_substring_compat)
+    if args.list_sections:
+        list_sections(knowledge_base)
+        return
+
+    queries = labels["queries"]
+    out_of_range = [q["query"] for q in queries if max(q["expected"]) >= len(knowledge_base)]
+    if out_of_range:
+        print(f"❌ Expected section IDs beyond the {len(knowledge_base)} sections for: {out_of_range}")
+        sys.exit(1)
+
+    needed = set(modes) | (set(hybrid_retrievers) if "hybrid" in modes else set())
+    if "bm25" in needed:
+        knowledge_base.get_bm25_index()
+    if "vector" in needed:
+        knowledge_base.load_vector_index(args.embeddings, get_embedder(args.embedder))
+
+    print("=" * 60)
+    print(f"🔎 Retrieval evaluation: {len(queries)} queries, {kb_path} ({len(knowledge_base)} sections)")
+    print(f"   Keywords: {args.keywords}")
+    print("=" * 60)
+
+    results = {
+        "settings": {
+            "labels": args.labels, "knowledge_base": kb_path, "version": knowledge_base.version,
+            "keywords": args.keywords, "substring_compat": not args.no_substring_compat,
+            "embedder": args.embedder, "hybrid": hybrid_retrievers, "top_k": TOP_K,
+        },
+        "modes": {},
+    }
+    for mode in modes:
+        results["modes"][mode] = evaluate_mode(knowledge_base, mode, queries, args.repeat, hybrid_retrievers)
+        print_mode(mode, results["modes"][mode], len(queries))
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Saved: {args.out}")
+
+    print("=" * 60)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_drop, args.max_slowdown, args.min_slowdown_ms)
+        if regressions:
+            print("❌ Regressions against the baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ No retrieval regression against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+FAQ fast path: answer directly from a stored Q&A pair without calling the LLM
+Used only when retrieval ranks a Q&A section first with a clear margin over the runner-up
+and the query shares most of its content words with the stored question
+"""
+
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Question scaffolding that says nothing about what is being asked for
+STOPWORDS = frozenset("""
+a an the and or of to in on at for from with by near here there this that these those
+i me my we our you your it its is are was be am do does did can could would should will
+where what when which who how why
+get go find reach see tell know want need please hi hello ok okay thanks um
+""".split())
+
+def content_words(text: str) -> FrozenSet[str]:
+    """Lowercased non-stopword tokens, with a plain plural 's' dropped"""
+    words = set()
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        words.add(token)
+    return frozenset(words)
+
+def question_overlap(query: str, question: str) -> float:
+    """Jaccard similarity of the content words of a query and a stored question"""
+    query_words, question_words = content_words(query), content_words(question)
+    if not query_words or not question_words:
+        return 0.0
+    return len(query_words & question_words) / len(query_words | question_words)
+
+class FAQEntry:
+    """A question and its stored answer, taken from one knowledge base section"""
+
+    def __init__(self, section_id: int, question: str, answer: str):
+        self.section_id = section_id
+        self.question = question
+        self.answer = answer
+
+def parse_faq_section(section: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a Q&A section into (question, answer)
+    Accepts "Q: ...\\nA: ..." and "<question ending in ?>\\n<answer>" layouts
+    """
+    lines = section.strip().split('\n')
+    if len(lines) < 2:
+        return None
+
+    question = lines[0].strip()
+    if question.startswith('Q:'):
+        question = question[2:].strip()
+    elif not question.endswith('?'):
+        return None
+
+    answer = '\n'.join(lines[1:]).strip()
+    if answer.startswith('A:'):
+        answer = answer[2:].strip()
+
+    if not question or not answer:
+        return None
+    return question, answer
+
+def extract_faq_entries(sections: List[str]) -> Dict[int, FAQEntry]:
+    """Index every Q&A section by section id"""
+    entries = {}
+    for section_id, section in enumerate(sections):
+        parsed = parse_faq_section(section)
+        if parsed:
+            entries[section_id] = FAQEntry(section_id, *parsed)
+    return entries
+
+class FAQFastPath:
+    """
+    Decides whether a ranking is confident enough to answer from a stored Q&A pair
+
+    Score thresholds are in the units of the retrieval mode's scores, after taking
+    out `faq_boost`, the flat bonus a scorer gives every Q&A section (the keyword
+    scorer's FAQ_SCORE): the boost ranks Q&A sections first for any query in their
+    category, so it says nothing about whether this particular question was asked.
+    The defaults suit the keyword scorer (category match 10, word overlap 1 each).
+    `min_overlap` is the share of content words the query must have in common with
+    the stored question, so a query that only hits the same category never fires.
+    """
+
+    def __init__(self, min_score: float = 12, min_margin: float = 1, min_overlap: float = 0.5,
+                 faq_boost: float = 0):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.min_overlap = min_overlap
+        self.faq_boost = faq_boost
+        self.considered = 0
+        self.fired = 0
+        self.rejected_not_faq = 0
+        self.rejected_score = 0
+        self.rejected_margin = 0
+        self.rejected_overlap = 0
+
+    def match(self, query: str, ranked: List[Tuple[float, int]], entries: Dict[int, FAQEntry]) -> Optional[FAQEntry]:
+        """Return the FAQ entry to answer with, or None to use the LLM"""
+        self.considered += 1
+        if not ranked or ranked[0][1] not in entries:
+            self.rejected_not_faq += 1
+            return None
+
+        top_score = ranked[0][0] - self.faq_boost
+        runner_up = max(
+            (score - self.faq_boost if section_id in entries else score for score, section_id in ranked[1:]),
+            default=0.0
+        )
+        if top_score < self.min_score:
+            self.rejected_score += 1
+            return None
+        if top_score - runner_up < self.min_margin:
+            self.rejected_margin += 1
+            return None
+
+        entry = entries[ranked[0][1]]
+        overlap = question_overlap(query, entry.question)
+        if overlap < self.min_overlap:
+            self.rejected_overlap += 1
+            return None
+
+        self.fired += 1
+        logger.info("🎯 FAQ fast path: '%s' (score %s, margin %s, overlap %.2f)",
+                    entry.question, top_score, top_score - runner_up, overlap)
+        return entry
+
+    def stats(self) -> Dict:
+        return {
+            "considered": self.considered,
+            "fired": self.fired,
+            "rejected_not_faq": self.rejected_not_faq,
+            "rejected_score": self.rejected_score,
+            "rejected_margin": self.rejected_margin,
+            "rejected_overlap": self.rejected_overlap,
+        }
@@ -0,0 +1,113 @@
+"""
+Hybrid retrieval: run several retrievers concurrently and fuse their rankings
+Retrievers that miss the latency budget are dropped instead of stalling the turn
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+import asyncio
+import time
+import logging
+
+from knowledge_base import KnowledgeBase, rank_sections
+from retrieval_executor import RetrievalOverloaded
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60  # Standard reciprocal-rank fusion constant
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[float, int]]],
+    k: int = RRF_K,
+    weights: Optional[List[float]] = None
+) -> List[Tuple[float, int]]:
+    """
+    Fuse several (score, section_id) rankings by summing weight / (k + rank)
+    Ties keep document order
+    """
+    fused: Dict[int, float] = defaultdict(float)
+    for i, ranked in enumerate(rankings):
+        weight = weights[i] if weights is not None else 1.0
+        for rank, (_, section_id) in enumerate(ranked, start=1):
+            fused[section_id] += weight / (k + rank)
+    return sorted(((score, section_id) for section_id, score in fused.items()), key=lambda x: (-x[0], x[1]))
+
+# (query, knowledge_base, mode, top_k) -> ranking, run off the event loop
+Ranker = Callable[[str, KnowledgeBase, str, int], Awaitable[List[Tuple[float, int]]]]
+
+async def _thread_rank(query: str, knowledge_base: KnowledgeBase, mode: str, depth: int) -> List[Tuple[float, int]]:
+    return await asyncio.to_thread(rank_sections, query, knowledge_base, mode, depth)
+
+async def _timed_rank(
+    query: str,
+    knowledge_base: KnowledgeBase,
+    mode: str,
+    depth: int,
+    rank: Ranker
+) -> Tuple[List[Tuple[float, int]], float]:
+    """Run one retriever off the event loop and time it"""
+    started = time.perf_counter()
+    ranked = await rank(query, knowledge_base, mode, depth)
+    return ranked, (time.perf_counter() - started) * 1000
+
+async def hybrid_rank(
+    query: str,
+    knowledge_base: KnowledgeBase,
+    retrievers: List[str],
+    budget_ms: float,
+    top_k: int = 4,
+    depth: int = 20,
+    rrf_k: int = RRF_K,
+    rank: Optional[Ranker] = None
+) -> Tuple[List[Tuple[float, int]], Dict]:
+    """
+    Run the retrievers concurrently and fuse whatever finishes within budget_ms
+    `rank` runs one retriever off the event loop (default: a thread from asyncio.to_thread)
+
+    Returns the fused top-k and a report such as
+    {"mode": "hybrid", "contributors": ["keyword"], "retrievers":
+     {"keyword": {"status": "ok", "ms": 0.4, "hits": 20}, "vector": {"status": "timeout", "ms": 50.0}}}
+    """
+    started = time.perf_counter()
+    tasks = {
+        asyncio.create_task(_timed_rank(query, knowledge_base, mode, depth, rank or _thread_rank)): mode
+        for mode in retrievers
+    }
+    done, pending = await asyncio.wait(tasks, timeout=budget_ms / 1000)
+
+    report: Dict = {"mode": "hybrid", "contributors": [], "retrievers": {}}
+    rankings = []
+    for task, mode in tasks.items():
+        if task in pending:
+            # A running worker finishes in the background; its result is discarded
+            task.cancel()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            report["retrievers"][mode] = {"status": "timeout", "ms": round(elapsed_ms, 2)}
+            logger.warning(f"⚠️ Retriever '{mode}' missed the {budget_ms}ms budget, dropped")
+            continue
+
+        try:
+            ranked, elapsed_ms = task.result()
+        except asyncio.TimeoutError:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            report["retrievers"][mode] = {"status": "timeout", "ms": round(elapsed_ms, 2)}
+            logger.warning(f"⚠️ Retriever '{mode}' timed out, dropped")
+            continue
+        except RetrievalOverloaded as e:
+            report["retrievers"][mode] = {"status": "overloaded"}
+            logger.warning(f"⚠️ Retriever '{mode}' skipped: {e}")
+            continue
+        except Exception as e:
+            report["retrievers"][mode] = {"status": "error", "error": str(e)}
+            logger.error(f"❌ Retriever '{mode}' failed: {e}")
+            continue
+
+        report["retrievers"][mode] = {"status": "ok", "ms": round(elapsed_ms, 2), "hits": len(ranked)}
+        if ranked:
+            report["contributors"].append(mode)
+            rankings.append(ranked)
+
+    fused = reciprocal_rank_fusion(rankings, k=rrf_k)[:top_k]
+    report["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info("🔀 Hybrid retrieval fused %s in %sms", report['contributors'], report['ms'])
+    return fused, report
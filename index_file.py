@@ -0,0 +1,331 @@
+"""
+Compact binary index file for the knowledge base
+Holds the text and its chunks, term dictionary, keyword postings, BM25 arrays and optional
+embeddings in one versioned file that rag_server.py memory-maps, so worker processes
+share the index through the OS page cache instead of each building their own copy
+
+Layout (little-endian):
+    0   8-byte magic, uint32 format version, uint32 reserved,
+        uint64 header offset, uint64 header length
+    64  arrays, each aligned to 64 bytes
+    ... JSON header: knowledge base version, keyword setup and the offset,
+        dtype and shape of every array
+"""
+
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from functools import lru_cache
+import os
+import json
+import struct
+import time
+import logging
+import numpy as np
+
+from inverted_index import InvertedIndex, trigrams
+from keyword_matcher import KeywordMatcher
+from bm25_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"RAGINDEX"
+INDEX_FORMAT_VERSION = 2
+ALIGNMENT = 64
+PREFIX = struct.Struct("<8sIIQQ")
+
+# ==========================
+# ARRAY VIEWS
+# ==========================
+class TermDictionary(Mapping):
+    """
+    Sorted term -> term id lookup over a byte blob
+    Terms are stored UTF-8 encoded and sorted bytewise; lookups binary-search the blob.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def encode(terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(blob, offsets) arrays for a list of strings; a dictionary needs them sorted bytewise"""
+        encoded = [term.encode('utf-8') for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    def term_bytes(self, term_id: int) -> bytes:
+        return self.blob[self.offsets[term_id]:self.offsets[term_id + 1]].tobytes()
+
+    def term(self, term_id: int) -> str:
+        return self.term_bytes(term_id).decode('utf-8')
+
+    def lookup(self, term: str) -> int:
+        """Term id, or -1 if the term is not in the dictionary"""
+        target = term.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.term_bytes(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self) and self.term_bytes(low) == target:
+            return low
+        return -1
+
+    def __getitem__(self, term: str) -> int:
+        term_id = self.lookup(term)
+        if term_id < 0:
+            raise KeyError(term)
+        return term_id
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self.lookup(term) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.term(term_id) for term_id in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+class CSRView:
+    """Row i of a compressed sparse row layout is values[offsets[i]:offsets[i + 1]]"""
+
+    def __init__(self, offsets: np.ndarray, values: np.ndarray):
+        self.offsets = offsets
+        self.values = values
+
+    @staticmethod
+    def encode(rows: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(offsets, values) arrays for a list of int rows"""
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=offsets[1:])
+        values = np.fromiter((value for row in rows for value in row), dtype=np.int32, count=int(offsets[-1]))
+        return offsets, values
+
+    def row(self, i: int) -> np.ndarray:
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def get(self, i: int, default=()) -> List[int]:
+        if i < 0 or i >= len(self):
+            return default
+        return self.row(i).tolist()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+class MappedPostings(Mapping):
+    """Term -> section ids, read from the index file"""
+
+    def __init__(self, terms: TermDictionary, rows: CSRView):
+        self.terms = terms
+        self.rows = rows
+
+    def get(self, term: str, default=()):
+        term_id = self.terms.lookup(term)
+        return self.rows.get(term_id) if term_id >= 0 else default
+
+    def __getitem__(self, term: str) -> List[int]:
+        return self.rows.get(self.terms[term])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+class MappedInvertedIndex(InvertedIndex):
+    """
+    InvertedIndex whose postings, trigrams and category sets live in the index file
+    Scoring is shared with InvertedIndex; only the word lookup works on term ids.
+    """
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray], word_cache_size: int = 4096):
+        self.substring_compat = header["substring_compat"]
+        self.matcher = KeywordMatcher(header["keyword_table"], whole_words=not self.substring_compat)
+        self.num_sections = header["num_sections"]
+        self.faq_ids: List[int] = np.flatnonzero(arrays["faq_flags"]).tolist()
+
+        self.terms = TermDictionary(arrays["terms_blob"], arrays["terms_offsets"])
+        self.term_rows = CSRView(arrays["postings_offsets"], arrays["postings"])
+        self.postings = MappedPostings(self.terms, self.term_rows)
+        self.num_postings = len(arrays["postings"])
+
+        self.trigram_dictionary = TermDictionary(arrays["trigrams_blob"], arrays["trigrams_offsets"])
+        self.trigram_rows = CSRView(arrays["trigram_term_offsets"], arrays["trigram_terms"])
+        self.category_postings = CSRView(arrays["category_offsets"], arrays["category_sections"])
+        self.section_category_rows = CSRView(arrays["section_category_offsets"], arrays["section_categories"])
+
+        self._word_postings = lru_cache(maxsize=word_cache_size)(self._lookup_word)
+
+    @property
+    def section_categories(self) -> List[Tuple[int, ...]]:
+        """Category ids per section, used to skip matching unchanged sections on reload"""
+        return [tuple(self.section_category_rows.get(i)) for i in range(self.num_sections)]
+
+    def _lookup_word(self, word: str) -> Tuple[int, ...]:
+        if not self.substring_compat:
+            return tuple(self.postings.get(word, ()))
+
+        rows = []
+        for gram in trigrams(word):
+            gram_id = self.trigram_dictionary.lookup(gram)
+            if gram_id < 0:
+                return ()
+            rows.append(self.trigram_rows.row(gram_id))
+        rows.sort(key=len)
+        candidates = rows[0]
+        for row in rows[1:]:
+            candidates = np.intersect1d(candidates, row, assume_unique=True)
+            if len(candidates) == 0:
+                return ()
+
+        section_ids = set()
+        for term_id in candidates.tolist():
+            if word in self.terms.term(term_id):
+                section_ids.update(self.term_rows.get(term_id))
+        return tuple(sorted(section_ids))
+
+def mapped_bm25_index(header: Dict, arrays: Dict[str, np.ndarray]) -> BM25Index:
+    """BM25Index over the arrays stored in the index file"""
+    bm25 = BM25Index.__new__(BM25Index)
+    bm25.k1 = header["bm25"]["k1"]
+    bm25.b = header["bm25"]["b"]
+    bm25.num_sections = header["num_sections"]
+    bm25.avg_doc_length = header["bm25"]["avg_doc_length"]
+    bm25.vocabulary = TermDictionary(arrays["bm25_terms_blob"], arrays["bm25_terms_offsets"])
+    bm25.doc_freqs = arrays["bm25_doc_freqs"]
+    bm25.offsets = arrays["bm25_offsets"]
+    bm25.doc_ids = arrays["bm25_doc_ids"]
+    bm25.weights = arrays["bm25_weights"]
+    bm25.idf = arrays["bm25_idf"]
+    bm25.doc_lengths = arrays["bm25_doc_lengths"]
+    return bm25
+
+# ==========================
+# WRITING
+# ==========================
+def sorted_terms(terms) -> List[str]:
+    """Terms in the bytewise order TermDictionary searches"""
+    return sorted(terms, key=lambda term: term.encode('utf-8'))
+
+def index_arrays(knowledge_base, embeddings: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Flatten an in-memory knowledge base into the arrays stored in the index file"""
+    index = knowledge_base.index
+    bm25 = knowledge_base.get_bm25_index()
+    arrays: Dict[str, np.ndarray] = {}
+
+    arrays["text"] = np.frombuffer(knowledge_base.text.encode('utf-8'), dtype=np.uint8)
+    arrays["sections_blob"], arrays["section_offsets"] = TermDictionary.encode(knowledge_base.sections)
+    arrays["body_offsets"] = np.array(
+        [len(section) - len(body) for section, body in zip(knowledge_base.sections, knowledge_base.section_bodies)],
+        dtype=np.int64
+    )
+    arrays["section_hashes"] = np.array(
+        [list(bytes.fromhex(h)) for h in knowledge_base.section_hashes], dtype=np.uint8
+    ).reshape(len(knowledge_base.sections), 20)
+    arrays["faq_flags"] = np.array(knowledge_base.faq_flags, dtype=np.uint8)
+
+    # Keyword postings, by bytewise-sorted term
+    terms = sorted_terms(index.postings)
+    term_ids = {term: term_id for term_id, term in enumerate(terms)}
+    arrays["terms_blob"], arrays["terms_offsets"] = TermDictionary.encode(terms)
+    arrays["postings_offsets"], arrays["postings"] = CSRView.encode([index.postings[term] for term in terms])
+
+    grams = sorted_terms(index.trigram_tokens)
+    arrays["trigrams_blob"], arrays["trigrams_offsets"] = TermDictionary.encode(grams)
+    arrays["trigram_term_offsets"], arrays["trigram_terms"] = CSRView.encode(
+        [sorted(term_ids[term] for term in index.trigram_tokens[gram]) for gram in grams]
+    )
+
+    num_categories = len(index.matcher.categories)
+    arrays["category_offsets"], arrays["category_sections"] = CSRView.encode(
+        [index.category_postings.get(category_id, []) for category_id in range(num_categories)]
+    )
+    arrays["section_category_offsets"], arrays["section_categories"] = CSRView.encode(index.section_categories)
+
+    # BM25, re-ordered by bytewise-sorted term
+    bm25_terms = sorted_terms(bm25.vocabulary)
+    order = np.array([bm25.vocabulary[term] for term in bm25_terms], dtype=np.int64)
+    arrays["bm25_terms_blob"], arrays["bm25_terms_offsets"] = TermDictionary.encode(bm25_terms)
+    arrays["bm25_doc_freqs"] = bm25.doc_freqs[order] if len(order) else bm25.doc_freqs
+    arrays["bm25_offsets"] = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(arrays["bm25_doc_freqs"], out=arrays["bm25_offsets"][1:])
+    slices = [np.arange(bm25.offsets[term_id], bm25.offsets[term_id + 1]) for term_id in order]
+    postings_order = np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+    arrays["bm25_doc_ids"] = bm25.doc_ids[postings_order]
+    arrays["bm25_weights"] = bm25.weights[postings_order]
+    arrays["bm25_idf"] = bm25.idf[order] if len(order) else bm25.idf
+    arrays["bm25_doc_lengths"] = bm25.doc_lengths
+
+    if embeddings is not None:
+        arrays["embeddings"] = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return arrays
+
+def write_index_file(index_path: str, knowledge_base, embeddings: Optional[np.ndarray] = None,
+                     embedder_name: Optional[str] = None) -> int:
+    """
+    Write the index file for a knowledge base and return its size in bytes
+    The file is written next to the target and renamed over it, so running
+    workers keep their mapping of the previous version until they reopen it.
+    """
+    arrays = index_arrays(knowledge_base, embeddings)
+    bm25 = knowledge_base.get_bm25_index()
+    header = {
+        "kb_version": knowledge_base.version,
+        "source": knowledge_base.path,
+        "created": int(time.time()),
+        "num_sections": len(knowledge_base.sections),
+        "substring_compat": knowledge_base.substring_compat,
+        "chunking": knowledge_base.chunking,
+        "max_chunk_chars": knowledge_base.max_chunk_chars,
+        "keyword_table": knowledge_base.keyword_table,
+        "bm25": {"k1": bm25.k1, "b": bm25.b, "avg_doc_length": bm25.avg_doc_length},
+        "embedder": embedder_name if embeddings is not None else None,
+        "arrays": {},
+    }
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\0" * ALIGNMENT)
+        for name, array in arrays.items():
+            offset = f.tell()
+            header["arrays"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_offset = f.tell()
+        f.write(header_bytes)
+        size = f.tell()
+        f.seek(0)
+        f.write(PREFIX.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, 0, header_offset, len(header_bytes)))
+    os.replace(tmp_path, index_path)
+    return size
+
+# ==========================
+# READING
+# ==========================
+def open_index_file(index_path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Memory-map an index file and return its header and array views"""
+    mapped = np.memmap(index_path, dtype=np.uint8, mode='r')
+    if len(mapped) < PREFIX.size:
+        raise ValueError(f"Not an index file: {index_path}")
+
+    magic, format_version, _, header_offset, header_length = PREFIX.unpack(mapped[:PREFIX.size].tobytes())
+    if magic != INDEX_MAGIC:
+        raise ValueError(f"Not an index file: {index_path}")
+    if format_version != INDEX_FORMAT_VERSION:
+        raise ValueError(
+            f"Index file {index_path} has format version {format_version}, "
+            f"expected {INDEX_FORMAT_VERSION}; rebuild it with build_index.py"
+        )
+
+    header = json.loads(mapped[header_offset:header_offset + header_length].tobytes().decode('utf-8'))
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = mapped[spec["offset"]:spec["offset"] + nbytes].view(dtype).reshape(shape)
+    return header, arrays
@@ -0,0 +1,183 @@
+"""
+Inverted index for keyword retrieval
+Scores only the sections that share terms with the query instead of scanning every section
+"""
+
+from typing import Dict, List, Optional, Tuple, Set
+from collections import defaultdict
+from functools import lru_cache
+import re
+import logging
+
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Same weights as the original linear scorer
+CATEGORY_SCORE = 10
+WORD_SCORE = 1
+FAQ_SCORE = 5
+MIN_WORD_LENGTH = 4
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(token: str) -> Set[str]:
+    """Return the set of 3-character substrings of a token"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class InvertedIndex:
+    """
+    Token -> section postings, built once per knowledge base
+
+    With substring_compat=True scores are identical to the original scorer,
+    which matched query words and keywords as substrings ("car" matches "card").
+    Query words never contain whitespace, so a substring hit always falls inside
+    one whitespace token; a trigram index over the vocabulary finds those tokens.
+    Category keywords are matched by a KeywordMatcher, once per section at build
+    time and once per query.
+    With substring_compat=False words and keywords only match whole words.
+
+    Given the index of a previous build with the same settings and, for each section,
+    its id in that build (None if new or edited), postings, vocabulary trigrams and
+    category sets are carried over and only the changed sections are tokenized and matched.
+    """
+
+    def __init__(
+        self,
+        sections_lower: List[str],
+        faq_flags: List[bool],
+        keyword_table: Dict[str, List[str]],
+        substring_compat: bool = True,
+        word_cache_size: int = 4096,
+        previous: Optional["InvertedIndex"] = None,
+        previous_ids: Optional[List[Optional[int]]] = None
+    ):
+        self.substring_compat = substring_compat
+        self.matcher = KeywordMatcher(keyword_table, whole_words=not substring_compat)
+        self.num_sections = len(sections_lower)
+        self.faq_ids: List[int] = [i for i, is_faq in enumerate(faq_flags) if is_faq]
+
+        if previous is not None and previous.substring_compat != substring_compat:
+            previous = None
+        if previous is None or previous_ids is None:
+            previous_ids = [None] * self.num_sections
+
+        # Postings of unchanged sections are renumbered, the rest are tokenized. A memory-mapped
+        # previous index (index_file.py) only lends its category sets.
+        reuse_postings = previous is not None and isinstance(previous.postings, dict)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        if reuse_postings:
+            new_ids = {old_id: section_id for section_id, old_id in enumerate(previous_ids) if old_id is not None}
+            for term, old_postings in previous.postings.items():
+                section_ids = [new_ids[old_id] for old_id in old_postings if old_id in new_ids]
+                if section_ids:
+                    postings[term] = section_ids
+        for section_id, section_lower in enumerate(sections_lower):
+            if reuse_postings and previous_ids[section_id] is not None:
+                continue
+            terms = section_lower.split() if substring_compat else tokenize(section_lower)
+            for term in set(terms):
+                postings[term].append(section_id)
+        for section_ids in postings.values():
+            section_ids.sort()  # Already sorted unless sections moved or were edited
+        self.postings: Dict[str, List[int]] = dict(postings)
+        self.num_postings = sum(len(section_ids) for section_ids in self.postings.values())
+
+        # Vocabulary trigrams, only needed to resolve substring matches
+        self.trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        if substring_compat:
+            if reuse_postings:
+                self.trigram_tokens.update((gram, set(terms)) for gram, terms in previous.trigram_tokens.items())
+                for term in previous.postings.keys() - self.postings.keys():
+                    for gram in trigrams(term):
+                        self.trigram_tokens[gram].discard(term)
+                new_terms = self.postings.keys() - previous.postings.keys()
+            else:
+                new_terms = self.postings.keys()
+            for term in new_terms:
+                for gram in trigrams(term):
+                    self.trigram_tokens[gram].add(term)
+
+        # Category sets are found in one matcher pass per section, unless already
+        # known from a previous build of an unchanged section
+        self.section_categories: List[Tuple[int, ...]] = []
+        category_postings: Dict[int, List[int]] = defaultdict(list)
+        previous_categories = previous.section_categories if previous is not None else None
+        for section_id, section_lower in enumerate(sections_lower):
+            old_id = previous_ids[section_id]
+            if old_id is not None:
+                categories = previous_categories[old_id]
+            else:
+                categories = tuple(sorted(self.matcher.category_ids(section_lower)))
+            self.section_categories.append(categories)
+            for category_id in categories:
+                category_postings[category_id].append(section_id)
+        self.category_postings: Dict[int, List[int]] = dict(category_postings)
+
+        self._word_postings = lru_cache(maxsize=word_cache_size)(self._lookup_word)
+
+        logger.info(
+            f"🗂️ Built inverted index: {len(self.postings)} terms, "
+            f"{self.num_sections} sections, substring_compat={substring_compat}"
+        )
+
+    # ==========================
+    # BUILD HELPERS
+    # ==========================
+    def _lookup_word(self, word: str) -> Tuple[int, ...]:
+        """Sections matching a single query word"""
+        if not self.substring_compat:
+            return tuple(self.postings.get(word, ()))
+
+        # Words are at least MIN_WORD_LENGTH long, so they always have trigrams
+        grams = sorted(trigrams(word), key=lambda gram: len(self.trigram_tokens.get(gram, ())))
+        candidates = set(self.trigram_tokens.get(grams[0], ()))
+        for gram in grams[1:]:
+            candidates &= self.trigram_tokens.get(gram, set())
+            if not candidates:
+                break
+
+        section_ids: Set[int] = set()
+        for term in candidates:
+            if word in term:
+                section_ids.update(self.postings[term])
+        return tuple(sorted(section_ids))
+
+    # ==========================
+    # QUERY
+    # ==========================
+    def query_categories(self, query_lower: str) -> List[str]:
+        """Categories whose keywords appear in the query"""
+        return self.matcher.categorize(query_lower)
+
+    def query_words(self, query_lower: str) -> List[str]:
+        """Query words long enough to count for overlap (duplicates kept)"""
+        words = query_lower.split() if self.substring_compat else tokenize(query_lower)
+        return [w for w in words if len(w) >= MIN_WORD_LENGTH]
+
+    def score(self, query: str) -> List[Tuple[int, int]]:
+        """
+        Score the sections that share terms with the query
+        Returns (score, section_id) pairs, best first, ties in document order
+        """
+        query_lower = query.lower()
+        scores: Dict[int, int] = defaultdict(int)
+
+        for category_id in self.matcher.category_ids(query_lower):
+            for section_id in self.category_postings.get(category_id, ()):
+                scores[section_id] += CATEGORY_SCORE
+
+        for word in self.query_words(query_lower):
+            for section_id in self._word_postings(word):
+                scores[section_id] += WORD_SCORE
+
+        for section_id in self.faq_ids:
+            scores[section_id] += FAQ_SCORE
+
+        ranked = [(score, section_id) for section_id, score in scores.items() if score > 0]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
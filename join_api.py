@@ -36,6 +36,12 @@ RAG_SERVER_URL = "https://noncontingently-stotious-edris.ngrok-free.dev/rag/chat
 # Set to True to use RAG, False to use direct Groq
 USE_RAG = True
 
+# Identifies the conversation to the RAG server so follow-up questions
+# can reuse what earlier turns retrieved (not sent to Groq directly)
+llm_params = {"model": LLM_MODEL}
+if USE_RAG:
+    llm_params.update({"channel": CHANNEL_NAME, "agent_rtc_uid": AGENT_RTC_UID})
+
 # ==========================
 # Request Body
 # ==========================
@@ -66,9 +72,7 @@ payload = {
             "max_history": MAX_HISTORY,
             "greeting_message": GREETING_MESSAGE,
             "failure_message": FAILURE_MESSAGE,
-            "params": {
-                "model": LLM_MODEL
-            }
+            "params": llm_params
         },
 
         # ========= TTS (Groq) =========
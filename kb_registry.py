@@ -0,0 +1,218 @@
+"""
+Registry of named knowledge bases for serving many venues from one process
+Each venue has its own knowledge base file, synonym table and system prompt.
+Indexes are loaded on first use and the least recently used ones are evicted
+when too many are resident.
+"""
+
+from typing import Callable, Dict, List, Optional
+from collections import OrderedDict
+import asyncio
+import json
+import os
+import logging
+
+from knowledge_base import KnowledgeBase
+from kb_watcher import KnowledgeBaseWatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KB_ID = "default"
+
+# {venue_name} and {context} are filled in per request
+DEFAULT_SYSTEM_PROMPT = """You are a helpful tour guide assistant for {venue_name}. You have access to specific information about the mall.
+
+Based on the following information:
+
+{context}
+
+Instructions:
+- Answer the user's questions clearly and concisely in 2-3 sentences maximum
+- If asked about a location, provide specific floor and landmark information
+- If the question is about directions, give step-by-step guidance
+- Keep responses friendly and helpful
+- If the information is not in the provided context, say "I don't have that specific information, but you can ask at the information desk on the ground floor"
+- Always be welcoming and professional as a mall guide"""
+
+DEFAULT_FALLBACK_PROMPT = "You are a helpful tour guide for {venue_name}. Answer briefly and clearly."
+
+class VenueConfig:
+    """Where a venue's knowledge base lives and how to prompt for it"""
+
+    def __init__(
+        self,
+        kb_id: str,
+        path: str,
+        keywords_path: str,
+        embeddings_path: str,
+        index_path: Optional[str] = None,
+        venue_name: str = "Central City Mall",
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        fallback_prompt: str = DEFAULT_FALLBACK_PROMPT
+    ):
+        self.kb_id = kb_id
+        self.path = path
+        self.keywords_path = keywords_path
+        self.embeddings_path = embeddings_path
+        self.index_path = index_path
+        self.venue_name = venue_name
+        self.system_prompt = system_prompt
+        self.fallback_prompt = fallback_prompt
+
+def load_venues(registry_path: str, default: VenueConfig) -> Dict[str, VenueConfig]:
+    """
+    Read venue definitions from a JSON file, e.g.
+    {"harbour-plaza": {"path": "./harbour.txt", "keywords": "./harbour_keywords.json",
+                       "venue_name": "Harbour Plaza", "system_prompt": "... {venue_name} ... {context}"}}
+    Missing fields fall back to the default venue; the default venue is always present.
+    """
+    venues = {default.kb_id: default}
+    if not os.path.exists(registry_path):
+        return venues
+
+    with open(registry_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    for kb_id, entry in entries.items():
+        path = entry.get("path", default.path)
+        venues[kb_id] = VenueConfig(
+            kb_id,
+            path=path,
+            keywords_path=entry.get("keywords", default.keywords_path),
+            embeddings_path=entry.get("embeddings", os.path.splitext(path)[0] + "_embeddings.npy"),
+            index_path=entry.get("index", os.path.splitext(path)[0] + "_index.bin"),
+            venue_name=entry.get("venue_name", default.venue_name),
+            system_prompt=entry.get("system_prompt", default.system_prompt),
+            fallback_prompt=entry.get("fallback_prompt", default.fallback_prompt)
+        )
+    logger.info(f"🏢 Loaded {len(venues)} venues from {registry_path}")
+    return venues
+
+class KnowledgeBaseRegistry:
+    """
+    Lazily loaded, LRU-evicted knowledge bases keyed by venue id
+
+    At most `max_resident` knowledge bases (and roughly `max_bytes` of index
+    memory) stay loaded; pinned venues are never evicted. When `watch_interval`
+    is set, every resident knowledge base is hot-reloaded on file changes.
+    """
+
+    def __init__(
+        self,
+        venues: Dict[str, VenueConfig],
+        build: Callable[[VenueConfig], KnowledgeBase],
+        max_resident: int = 8,
+        max_bytes: int = 512 * 1024 * 1024,
+        pinned: Optional[List[str]] = None,
+        watch_interval: Optional[float] = None,
+        on_replace: Optional[Callable[[KnowledgeBase, KnowledgeBase], None]] = None
+    ):
+        self.venues = venues
+        self.build = build
+        self.max_resident = max_resident
+        self.max_bytes = max_bytes
+        self.pinned = set(pinned or [DEFAULT_KB_ID])
+        self.watch_interval = watch_interval
+        self.on_replace = on_replace
+        self._loaded: "OrderedDict[str, KnowledgeBase]" = OrderedDict()
+        self._watchers: Dict[str, KnowledgeBaseWatcher] = {}
+        self._watching = False  # Set by start_watchers(), once the event loop is running
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, kb_id: str) -> bool:
+        return kb_id in self.venues
+
+    def venue(self, kb_id: str) -> VenueConfig:
+        return self.venues[kb_id]
+
+    def get_loaded(self, kb_id: str) -> Optional[KnowledgeBase]:
+        """The resident knowledge base for a venue, without loading it"""
+        return self._loaded.get(kb_id)
+
+    def load_now(self, kb_id: str) -> KnowledgeBase:
+        """Load a venue synchronously (startup, or callers outside the event loop)"""
+        knowledge_base = self._loaded.get(kb_id)
+        if knowledge_base is None:
+            knowledge_base = self.build(self.venues[kb_id])
+            self._admit(kb_id, knowledge_base)
+        return knowledge_base
+
+    async def get(self, kb_id: str) -> KnowledgeBase:
+        """Return a venue's knowledge base, loading it off the event loop on first use"""
+        knowledge_base = self._loaded.get(kb_id)
+        if knowledge_base is not None:
+            self._loaded.move_to_end(kb_id)
+            return knowledge_base
+
+        lock = self._locks.setdefault(kb_id, asyncio.Lock())
+        async with lock:
+            knowledge_base = self._loaded.get(kb_id)
+            if knowledge_base is None:
+                logger.info(f"📚 Loading knowledge base for venue '{kb_id}'")
+                knowledge_base = await asyncio.to_thread(self.build, self.venues[kb_id])
+                self._admit(kb_id, knowledge_base)
+        return knowledge_base
+
+    def publish(self, kb_id: str, knowledge_base: KnowledgeBase):
+        """Swap in a rebuilt knowledge base; turns already running keep the old one"""
+        previous = self._loaded.get(kb_id)
+        if previous is None:
+            return  # Evicted while it was being rebuilt
+        self._loaded[kb_id] = knowledge_base
+        if self.on_replace is not None:
+            self.on_replace(previous, knowledge_base)
+
+    def _admit(self, kb_id: str, knowledge_base: KnowledgeBase):
+        self._loaded[kb_id] = knowledge_base
+        self.loads += 1
+        if self.watch_interval:
+            watcher = KnowledgeBaseWatcher(
+                self.venues[kb_id].path,
+                lambda: self._loaded[kb_id],
+                lambda updated: self.publish(kb_id, updated),
+                interval=self.watch_interval
+            )
+            self._watchers[kb_id] = watcher
+            if self._watching:
+                watcher.start()
+        self._evict(keep=kb_id)
+
+    def start_watchers(self):
+        """Start watching the loaded venues, and any loaded later; call from the running event loop"""
+        self._watching = True
+        for watcher in self._watchers.values():
+            watcher.start()
+
+    def resident_bytes(self) -> int:
+        return sum(knowledge_base.memory_estimate() for knowledge_base in self._loaded.values())
+
+    def _evict(self, keep: str):
+        """Drop least recently used, unpinned knowledge bases (never `keep`) until within limits"""
+        while len(self._loaded) > self.max_resident or \
+                (len(self._loaded) > 1 and self.resident_bytes() > self.max_bytes):
+            victim = next((kb_id for kb_id in self._loaded if kb_id not in self.pinned and kb_id != keep), None)
+            if victim is None:
+                break
+            knowledge_base = self._loaded.pop(victim)
+            watcher = self._watchers.pop(victim, None)
+            if watcher is not None:
+                asyncio.ensure_future(watcher.stop())
+            self.evictions += 1
+            logger.info(f"♻️ Evicted knowledge base for venue '{victim}' (version {knowledge_base.version})")
+
+    async def close(self):
+        self._watching = False
+        for watcher in self._watchers.values():
+            await watcher.stop()
+        self._watchers.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "venues": len(self.venues),
+            "resident": list(self._loaded),
+            "resident_bytes": self.resident_bytes(),
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,102 @@
+"""
+Hot reloading for the knowledge base file
+Polls the file's mtime and size, rebuilds off the event loop and swaps the new
+knowledge base in with a single reference assignment (read-copy-update)
+"""
+
+from typing import Callable, Optional, Tuple
+import asyncio
+import os
+import time
+import logging
+
+from knowledge_base import KnowledgeBase, load_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+def file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """(mtime in ns, size) of a file, or None if it is missing"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class KnowledgeBaseWatcher:
+    """
+    Background task that reloads the knowledge base when its file changes
+
+    Requests read the current knowledge base once per turn, so a reload never
+    blocks them: the rebuild runs in a worker thread and the finished instance
+    is published by `publish`, while in-flight turns finish on the old one.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        get_current: Callable[[], KnowledgeBase],
+        publish: Callable[[KnowledgeBase], None],
+        interval: float = 2.0
+    ):
+        self.file_path = file_path
+        self.get_current = get_current
+        self.publish = publish
+        self.interval = interval
+        self.reloads = 0
+        self._signature = file_signature(file_path)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"👀 Watching {self.file_path} for changes every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = file_signature(self.file_path)
+            if signature is None or signature == self._signature:
+                continue
+            try:
+                if await self.reload():
+                    self._signature = signature
+            except Exception as e:
+                logger.error(f"❌ Knowledge base reload failed, keeping the current version: {e}", exc_info=True)
+                self._signature = signature
+
+    async def reload(self) -> bool:
+        """
+        Rebuild from the file if its content changed
+        Returns False when the file was caught mid-write and should be retried
+        """
+        signature = file_signature(self.file_path)
+        text = await asyncio.to_thread(load_knowledge_base, self.file_path)
+        if file_signature(self.file_path) != signature:
+            return False
+
+        current = self.get_current()
+        if not text:
+            logger.warning("⚠️ Knowledge base file is empty or missing, keeping the current version")
+            return True
+
+        if current.version_for(text) == current.version:
+            return True
+
+        started = time.perf_counter()
+        updated = await asyncio.to_thread(current.rebuild, text)
+        self.publish(updated)
+        self.reloads += 1
+        logger.info(
+            f"🔄 Reloaded knowledge base {current.version} -> {updated.version} "
+            f"in {time.perf_counter() - started:.2f}s: {updated.diff(current)}"
+        )
+        return True
@@ -0,0 +1,116 @@
+"""
+Single-pass keyword matching for the location synonym table
+The category -> keywords table is compiled once into an Aho-Corasick automaton
+"""
+
+from typing import Dict, List, Set, Tuple
+from collections import deque
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def load_keyword_table(file_path: str) -> Dict[str, List[str]]:
+    """Load a category -> keywords synonym table from a JSON file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+
+    if not isinstance(table, dict) or not all(
+        isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)
+        for keywords in table.values()
+    ):
+        raise ValueError(f"Keyword table must map category names to lists of strings: {file_path}")
+
+    logger.info(f"✅ Loaded keyword table: {len(table)} categories from {file_path}")
+    return {category: [k.lower() for k in keywords if k] for category, keywords in table.items()}
+
+def is_word_char(char: str) -> bool:
+    """Characters that join a keyword to its neighbours in whole-word mode"""
+    return char.isalnum() or char == '_'
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every keyword of every category
+
+    categorize() finds all categories mentioned in a text in one left-to-right
+    pass. By default a keyword matches anywhere as a substring, exactly like
+    `keyword in text`; with whole_words=True it must not touch other word
+    characters on either side.
+    """
+
+    def __init__(self, keyword_table: Dict[str, List[str]], whole_words: bool = False):
+        self.keyword_table = keyword_table
+        self.whole_words = whole_words
+        self.categories: List[str] = list(keyword_table)
+
+        # State 0 is the root; outputs hold (category id, keyword length) pairs
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[Tuple[int, int]]] = [[]]
+
+        for category_id, keywords in enumerate(keyword_table.values()):
+            for keyword in keywords:
+                self._add(keyword.lower(), category_id)
+        self._link()
+
+        logger.info(
+            f"🔤 Compiled keyword matcher: {len(self.categories)} categories, "
+            f"{len(self.goto)} states, whole_words={whole_words}"
+        )
+
+    def _add(self, keyword: str, category_id: int):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        if (category_id, len(keyword)) not in self.outputs[state]:
+            self.outputs[state].append((category_id, len(keyword)))
+
+    def _link(self):
+        """Breadth-first pass setting failure links and merging outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                link = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = link if link != next_state else 0
+                self.outputs[next_state] = self.outputs[next_state] + [
+                    output for output in self.outputs[self.fail[next_state]]
+                    if output not in self.outputs[next_state]
+                ]
+
+    def category_ids(self, text_lower: str) -> Set[int]:
+        """Ids of the categories with at least one keyword in the (lowercased) text"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        whole_words = self.whole_words
+        found: Set[int] = set()
+        state = 0
+        for position, char in enumerate(text_lower):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            for category_id, length in outputs[state]:
+                if whole_words:
+                    start = position - length + 1
+                    end = position + 1
+                    if (start > 0 and is_word_char(text_lower[start - 1])) or \
+                            (end < len(text_lower) and is_word_char(text_lower[end])):
+                        continue
+                found.add(category_id)
+        return found
+
+    def categorize(self, text_lower: str) -> List[str]:
+        """Categories mentioned in the (lowercased) text, in table order"""
+        return [self.categories[category_id] for category_id in sorted(self.category_ids(text_lower))]
@@ -0,0 +1,357 @@
+"""
+Knowledge base loading and keyword search for the RAG server
+The knowledge base is read, split and lowercased once and shared by every request
+"""
+
+from typing import Dict, List, Optional, Tuple
+import os
+import hashlib
+import time
+import logging
+import numpy as np
+
+from inverted_index import InvertedIndex
+from bm25_index import BM25Index
+from keyword_matcher import load_keyword_table
+from vector_index import VectorIndex
+from faq_fast_path import FAQEntry, extract_faq_entries
+from index_file import MappedInvertedIndex, mapped_bm25_index, open_index_file
+from chunker import chunk_text, DEFAULT_CHUNKING, DEFAULT_MAX_CHUNK_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Sections starting with any of these get the FAQ boost
+FAQ_PREFIXES = ('Q:', 'Where', 'How')
+
+# Ranking modes: "keyword" is the original weighted keyword scorer, "bm25" is Okapi BM25,
+# "vector" is cosine similarity over section embeddings
+RETRIEVAL_MODES = ("keyword", "bm25", "vector")
+TOP_K = 4
+
+# Category -> synonyms table used by the keyword scorer
+DEFAULT_KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "location_keywords.json")
+
+# ==========================
+# LOADING
+# ==========================
+def load_knowledge_base(file_path: str) -> str:
+    """Load the knowledge base from a text file"""
+    try:
+        if not os.path.exists(file_path):
+            logger.error(f"❌ Knowledge base file not found: {file_path}")
+            logger.error(f"Current directory: {os.getcwd()}")
+            logger.error(f"Files in directory: {os.listdir('.')}")
+            return ""
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        logger.info(f"✅ Loaded knowledge base: {len(content)} characters")
+        return content
+    except Exception as e:
+        logger.error(f"❌ Error loading knowledge base: {e}")
+        return ""
+
+def text_version(text: str, chunking: str = "blank_lines", max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS) -> str:
+    """Short content hash identifying a knowledge base version (its text and how it is chunked)"""
+    if chunking != "blank_lines":
+        text = f"{chunking}:{max_chunk_chars}\n{text}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def section_hash(section: str) -> str:
+    """Content hash identifying a section across reloads"""
+    return hashlib.sha1(section.encode('utf-8')).hexdigest()
+
+def is_faq_section(section: str) -> bool:
+    """Check if a section looks like a Q&A entry"""
+    return section.strip().startswith(FAQ_PREFIXES)
+
+class KnowledgeBase:
+    """
+    In-memory knowledge base, split into sections once
+    Holds the raw text, the sections, their lowercased text, FAQ flags, Q&A answers and keyword index.
+    Sections are the chunks produced by chunker.chunk_text: with "structured" chunking
+    each starts with the headings above it, and FAQ detection looks at the body only.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        path: Optional[str] = None,
+        keyword_table: Optional[Dict[str, List[str]]] = None,
+        substring_compat: bool = True,
+        previous: Optional["KnowledgeBase"] = None,
+        chunking: str = DEFAULT_CHUNKING,
+        max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS
+    ):
+        self.path = path
+        self.index_path: Optional[str] = None
+        self.text = text
+        self.chunking = chunking
+        self.max_chunk_chars = max_chunk_chars
+        self.version = text_version(text, chunking, max_chunk_chars)
+        self.keyword_table = keyword_table if keyword_table is not None else load_keyword_table(DEFAULT_KEYWORDS_PATH)
+        self.substring_compat = substring_compat
+        chunks = chunk_text(text, chunking, max_chunk_chars)
+        self.sections: List[str] = [chunk.text for chunk in chunks]
+        self.section_bodies: List[str] = [chunk.body for chunk in chunks]
+        self.section_hashes: List[str] = [section_hash(section) for section in self.sections]
+        self.sections_lower: List[str] = [section.lower() for section in self.sections]
+        self.faq_flags: List[bool] = [is_faq_section(body) for body in self.section_bodies]
+        self.faq_entries: Dict[int, FAQEntry] = extract_faq_entries(self.section_bodies)
+        self.index = InvertedIndex(
+            self.sections_lower, self.faq_flags, self.keyword_table,
+            substring_compat=substring_compat,
+            previous=previous.index if previous is not None else None,
+            previous_ids=self._previous_ids(previous)
+        )
+        self.bm25_index: Optional[BM25Index] = None
+        self.vector_index: Optional[VectorIndex] = None
+        logger.info(f"📑 Indexed knowledge base into {len(self.sections)} sections")
+
+    def _previous_ids(self, previous: Optional["KnowledgeBase"]) -> Optional[List[Optional[int]]]:
+        """
+        Each section's id in a previous build with the same keyword setup, or None if it is new or edited
+        Identical sections are paired up in order, each previous section at most once.
+        """
+        if previous is None or previous.keyword_table != self.keyword_table \
+                or previous.substring_compat != self.substring_compat:
+            return None
+        old_ids: Dict[str, List[int]] = {}
+        for old_id, old_hash in enumerate(previous.section_hashes):
+            old_ids.setdefault(old_hash, []).append(old_id)
+        for ids in old_ids.values():
+            ids.reverse()
+        return [old_ids[section_hash].pop() if old_ids.get(section_hash) else None for section_hash in self.section_hashes]
+
+    def version_for(self, text: str) -> str:
+        """Version a rebuild from this text would get"""
+        return text_version(text, self.chunking, self.max_chunk_chars)
+
+    def diff(self, previous: "KnowledgeBase") -> Dict[str, int]:
+        """Count sections added, removed and kept, by content hash"""
+        old_hashes = set(previous.section_hashes)
+        new_hashes = set(self.section_hashes)
+        return {
+            "added": len(new_hashes - old_hashes),
+            "removed": len(old_hashes - new_hashes),
+            "unchanged": len(new_hashes & old_hashes),
+        }
+
+    def rebuild(self, text: str) -> "KnowledgeBase":
+        """
+        Build a new knowledge base from updated text, reusing work for unchanged sections
+        Keyword postings, vocabulary trigrams, category sets and embeddings are carried
+        over; only added or edited sections are tokenized, matched and embedded. BM25 is
+        rebuilt in full, since its IDF and length normalisation depend on every section.
+        The current instance is left untouched, so in-flight requests keep using it.
+        """
+        updated = KnowledgeBase(
+            text,
+            path=self.path,
+            keyword_table=self.keyword_table,
+            substring_compat=self.substring_compat,
+            previous=self,
+            chunking=self.chunking,
+            max_chunk_chars=self.max_chunk_chars
+        )
+        if self.bm25_index is not None:
+            updated.get_bm25_index()
+        if self.vector_index is not None:
+            updated.vector_index = self.vector_index.update(
+                self.section_hashes, updated.sections, updated.section_hashes
+            )
+        return updated
+
+    @classmethod
+    def from_file(
+        cls,
+        file_path: str,
+        keywords_path: str = DEFAULT_KEYWORDS_PATH,
+        substring_compat: bool = True,
+        chunking: str = DEFAULT_CHUNKING,
+        max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS
+    ) -> "KnowledgeBase":
+        """Load, chunk and index a knowledge base file with its keyword table"""
+        return cls(
+            load_knowledge_base(file_path),
+            path=file_path,
+            keyword_table=load_keyword_table(keywords_path),
+            substring_compat=substring_compat,
+            chunking=chunking,
+            max_chunk_chars=max_chunk_chars
+        )
+
+    @classmethod
+    def from_index_file(
+        cls,
+        index_path: str,
+        file_path: Optional[str] = None,
+        keyword_table: Optional[Dict[str, List[str]]] = None,
+        substring_compat: bool = True,
+        chunking: str = DEFAULT_CHUNKING,
+        max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS,
+        embedder=None,
+        min_score: float = 0.0
+    ) -> Optional["KnowledgeBase"]:
+        """
+        Open a knowledge base from an index file written by build_index.py
+        The postings, BM25 arrays and embeddings stay memory-mapped. Returns None if the
+        file is unreadable or was built from other text, keywords or chunking settings.
+        """
+        started = time.perf_counter()
+        try:
+            header, arrays = open_index_file(index_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cannot open index file {index_path}: {e}")
+            return None
+
+        if (header["chunking"], header["max_chunk_chars"]) != (chunking, max_chunk_chars):
+            logger.warning(
+                f"⚠️ Index file {index_path} was chunked with {header['chunking']}:{header['max_chunk_chars']}, ignoring it"
+            )
+            return None
+        if file_path is not None and os.path.exists(file_path):
+            current_version = text_version(load_knowledge_base(file_path), chunking, max_chunk_chars)
+            if current_version != header["kb_version"]:
+                logger.warning(
+                    f"⚠️ Index file {index_path} is stale (built for {header['kb_version']}, "
+                    f"{file_path} is {current_version}), ignoring it"
+                )
+                return None
+        if keyword_table is not None and keyword_table != header["keyword_table"]:
+            logger.warning(f"⚠️ Index file {index_path} was built with another keyword table, ignoring it")
+            return None
+        if substring_compat != header["substring_compat"]:
+            logger.warning(f"⚠️ Index file {index_path} was built with substring_compat={header['substring_compat']}, ignoring it")
+            return None
+
+        knowledge_base = cls.__new__(cls)
+        knowledge_base.path = file_path
+        knowledge_base.index_path = index_path
+        text_bytes = arrays["text"].tobytes()
+        knowledge_base.text = text_bytes.decode('utf-8')
+        knowledge_base.version = header["kb_version"]
+        knowledge_base.keyword_table = header["keyword_table"]
+        knowledge_base.substring_compat = header["substring_compat"]
+        knowledge_base.chunking = header["chunking"]
+        knowledge_base.max_chunk_chars = header["max_chunk_chars"]
+        sections_bytes = arrays["sections_blob"].tobytes()
+        section_offsets = arrays["section_offsets"].tolist()
+        knowledge_base.sections = [
+            sections_bytes[start:end].decode('utf-8') for start, end in zip(section_offsets, section_offsets[1:])
+        ]
+        knowledge_base.section_bodies = [
+            section[body_start:] for section, body_start in zip(knowledge_base.sections, arrays["body_offsets"].tolist())
+        ]
+        knowledge_base.section_hashes = [digest.tobytes().hex() for digest in arrays["section_hashes"]]
+        knowledge_base.sections_lower = [section.lower() for section in knowledge_base.sections]
+        knowledge_base.faq_flags = arrays["faq_flags"].astype(bool).tolist()
+        knowledge_base.faq_entries = extract_faq_entries(knowledge_base.section_bodies)
+        knowledge_base.index = MappedInvertedIndex(header, arrays)
+        knowledge_base.bm25_index = mapped_bm25_index(header, arrays)
+        knowledge_base.vector_index = None
+        if embedder is not None and "embeddings" in arrays:
+            if header["embedder"] == embedder.name and arrays["embeddings"].shape[1] == embedder.dim:
+                knowledge_base.vector_index = VectorIndex(arrays["embeddings"], embedder, min_score=min_score)
+            else:
+                logger.warning(f"⚠️ Index file embeddings use {header['embedder']}, not {embedder.name}, ignoring them")
+
+        logger.info(
+            f"🗺️ Memory-mapped index {index_path}: {len(knowledge_base.sections)} sections "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return knowledge_base
+
+    def get_bm25_index(self) -> BM25Index:
+        """Return the BM25 index, building it on first use"""
+        if self.bm25_index is None:
+            self.bm25_index = BM25Index(self.sections)
+        return self.bm25_index
+
+    def load_vector_index(self, embeddings_path: str, embedder, min_score: float = 0.0) -> VectorIndex:
+        """Memory-map prebuilt embeddings, or embed the sections in memory if they are missing or stale"""
+        self.vector_index = VectorIndex.load(
+            embeddings_path, embedder, self.version, len(self.sections), min_score=min_score
+        )
+        if self.vector_index is None:
+            logger.warning("⚠️ Embedding sections in memory, run build_embeddings.py to precompute them")
+            self.vector_index = VectorIndex.build(self.sections, embedder, min_score=min_score)
+        return self.vector_index
+
+    def memory_estimate(self) -> int:
+        """Rough resident size in bytes, used to decide which knowledge bases to evict"""
+        size = 3 * len(self.text)  # text, sections and lowercased sections
+        if self.index_path is not None:
+            # Postings, BM25 arrays and embeddings live in the shared page cache
+            return size
+        size += 40 * self.index.num_postings + 100 * len(self.index.postings)
+        if self.bm25_index is not None:
+            bm25 = self.bm25_index
+            size += bm25.doc_ids.nbytes + bm25.weights.nbytes + bm25.offsets.nbytes + 100 * len(bm25.vocabulary)
+        if self.vector_index is not None and not isinstance(self.vector_index.matrix, np.memmap):
+            # Memory-mapped embeddings live in the shared page cache instead
+            size += self.vector_index.matrix.nbytes
+        return size
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+# ==========================
+# SEARCH
+# ==========================
+def rank_sections(
+    query: str,
+    knowledge_base: KnowledgeBase,
+    mode: str = "keyword",
+    top_k: int = TOP_K
+) -> List[Tuple[float, int]]:
+    """Return the top (score, section_id) pairs for a query, best first"""
+    if mode == "keyword":
+        # Score only the sections sharing terms with the query
+        return knowledge_base.index.score(query)[:top_k]
+    if mode == "bm25":
+        return knowledge_base.get_bm25_index().score(query, top_k=top_k)
+    if mode == "vector":
+        if knowledge_base.vector_index is None:
+            logger.warning("⚠️ No vector index loaded, falling back to keyword search")
+            return knowledge_base.index.score(query)[:top_k]
+        return knowledge_base.vector_index.score(query, top_k=top_k)
+    raise ValueError(f"Unknown retrieval mode: {mode}")
+
+def context_sections(ranked: List[Tuple[float, int]], knowledge_base: KnowledgeBase) -> List[str]:
+    """The ranked sections, best first, or the overview sections when nothing matched"""
+    sections = knowledge_base.sections
+    top_chunks = [sections[section_id] for _, section_id in ranked]
+
+    if top_chunks:
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Found %d relevant sections, total length: %d", len(top_chunks), sum(len(c) for c in top_chunks))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First 200 chars of result: %s", top_chunks[0][:200])
+        return top_chunks
+
+    # If no matches, return overview and first sections
+    logger.warning("⚠️ No specific matches, returning overview")
+    return sections[:3]
+
+def format_context(ranked: List[Tuple[float, int]], knowledge_base: KnowledgeBase) -> str:
+    """Join the ranked sections, or fall back to the overview when nothing matched"""
+    return "\n\n".join(context_sections(ranked, knowledge_base))
+
+def search_knowledge_base(query: str, knowledge_base: KnowledgeBase, mode: str = "keyword") -> str:
+    """
+    Enhanced keyword-based search with Q&A format support
+    Works well for location-based queries
+    """
+    logger.info("🔍 Searching for: '%s' (mode: %s)", query, mode)
+
+    if not knowledge_base:
+        logger.error("❌ Knowledge base is empty!")
+        return ""
+
+    # Take top 4
+    return format_context(rank_sections(query, knowledge_base, mode=mode), knowledge_base)
@@ -0,0 +1,168 @@
+"""
+Application-lifetime LLM client
+One AsyncOpenAI client with a pooled, keep-alive HTTP connection is shared by every request
+"""
+
+from typing import Optional, Tuple
+import asyncio
+import logging
+import time
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events that mean the warm-up connection is open and ready for requests
+CONNECTED_EVENTS = ("http11.send_request_headers.started", "http2.send_request_headers.started")
+
+def http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional h2 package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def resolve_backend(
+    backend: str,
+    api_key: str,
+    base_url: str
+) -> Tuple[str, str, Optional[httpx.AsyncBaseTransport]]:
+    """
+    API key, base URL and transport for an LLM backend setting
+    "groq"             -> the given key and URL
+    "mock[:<profile>]" -> the in-process mock from mock_llm.py (no network)
+    "http(s)://..."    -> any OpenAI-compatible server, e.g. python mock_llm.py
+    """
+    if backend == "groq":
+        return api_key, base_url, None
+    kind, _, profile = backend.partition(":")
+    if kind == "mock":
+        from mock_llm import MockLLMTransport, get_profile
+        return "mock", "http://mock-llm/v1", MockLLMTransport(get_profile(profile or "groq"))
+    if backend.startswith(("http://", "https://")):
+        return api_key, backend, None
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+class LLMClientManager:
+    """
+    Owns the shared AsyncOpenAI client and its connection pool
+    The client is created on first use and closed on shutdown. warm() opens a pooled
+    connection ahead of a request when the pool may have gone cold.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 30.0,
+        warm_after: float = 20.0,
+        warm_timeout: float = 2.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = timeout
+        self.warm_after = warm_after
+        self.warm_timeout = warm_timeout
+        self.transport = transport
+        self._last_request = 0.0
+        self._warming: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+
+    def get(self) -> AsyncOpenAI:
+        """Return the shared client, creating the connection pool on first use"""
+        if self._client is None:
+            http2 = self.http2
+            if self.transport is not None:
+                http2 = False
+            elif http2 and not http2_available():
+                logger.warning("⚠️ HTTP/2 requested but 'h2' is not installed, using HTTP/1.1 (pip install h2)")
+                http2 = False
+
+            self._http_client = httpx.AsyncClient(
+                http2=http2,
+                transport=self.transport,
+                timeout=self.timeout,
+                event_hooks={"request": [self._on_request]},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self._http_client
+            )
+            logger.info(
+                f"🔌 Created shared LLM client for {self.base_url} "
+                f"(max {self.max_connections} connections, keep-alive {self.keepalive_expiry}s, http2={http2})"
+            )
+        return self._client
+
+    async def _on_request(self, request: httpx.Request):
+        self._last_request = time.monotonic()
+
+    def warm(self) -> Optional[asyncio.Event]:
+        """
+        Start opening a connection to the LLM API if nothing was sent in the last `warm_after` seconds
+        Returns an event that is set once the connection is open (or the attempt ended), shared
+        by concurrent callers, or None if the pool should still be warm. The warm-up request
+        itself finishes in the background; callers only ever wait for the handshake.
+        """
+        if self._warming is not None and not self._warming.done():
+            return self._connected
+        if time.monotonic() - self._last_request < self.warm_after:
+            return None
+        self.get()
+        self._last_request = time.monotonic()
+        self._connected = asyncio.Event()
+        self._warming = asyncio.create_task(self._warm_up(self._connected))
+        return self._connected
+
+    async def _warm_up(self, connected: asyncio.Event):
+        """
+        Unauthenticated HEAD on the API base URL whose only purpose is the TCP/TLS handshake
+        No API key is sent, so it does not count against the account's rate limits.
+        """
+        async def trace(event_name: str, info: dict):
+            if event_name in CONNECTED_EVENTS:
+                connected.set()
+
+        started = time.perf_counter()
+        try:
+            response = await self._http_client.head(
+                self.base_url,
+                timeout=self.warm_timeout,
+                extensions={"trace": trace}
+            )
+            await response.aclose()
+            logger.debug(f"🔥 Warmed LLM connection in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.debug(f"⚠️ LLM connection warm-up failed: {e}")
+        finally:
+            connected.set()
+
+    async def close(self):
+        """Close the client and its pooled connections"""
+        if self._warming is not None:
+            self._warming.cancel()
+            self._warming = None
+        if self._client is not None:
+            await self._client.close()
+            await self._http_client.aclose()
+            logger.info("🔌 Closed shared LLM client")
+        self._client = None
+        self._http_client = None
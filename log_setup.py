@@ -0,0 +1,70 @@
+"""
+Logging setup for the RAG server
+Request handlers only put records on a queue; a background thread formats and writes
+them, so a slow terminal or log pipe never blocks the event loop. "json" emits one
+object per line with any `extra=` fields attached to the record.
+"""
+
+from typing import Optional
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMATS = ("text", "json")
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from `extra=`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue the record as is; the stock QueueHandler formats it in the caller's thread
+    %-style arguments are rendered on the logging thread, so pass values that will not change.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(level: str = "INFO", fmt: str = "text", use_queue: bool = True) -> Optional[logging.handlers.QueueListener]:
+    """Configure the root logger; returns the background listener when use_queue is set"""
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}")
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if not use_queue:
+        root.addHandler(output)
+        return None
+
+    records = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
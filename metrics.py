@@ -0,0 +1,134 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics
+Counters and fixed-bucket histograms are plain dicts updated on the event loop, so
+recording costs a dict lookup and a bisect per value; nothing is computed until a scrape.
+Values other components already count (cache hits, executor rejections) are read from
+their stats() at scrape time through callbacks instead of being counted twice.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from bisect import bisect_left
+import math
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(labels[name] for name in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in self.values.items()]
+
+class Histogram:
+    """Observations counted into fixed cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(labels)
+        self.series: Dict[Tuple[str, ...], List] = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(labels[name] for name in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+class Callback:
+    """A value read at scrape time: a number, {label value: number}, or None to skip"""
+
+    def __init__(self, name: str, help_text: str, kind: str, read: Callable[[], Union[None, float, Dict[str, float]]],
+                 label: Optional[str] = None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.read = read
+        self.label = label
+
+    def samples(self) -> List[str]:
+        value = self.read()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels([self.label], [key])} {_number(v)}" for key, v in value.items()]
+        return [f"{self.name} {_number(value)}"]
+
+class MetricsRegistry:
+    """Named metrics, rendered together in registration order"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Union[Counter, Histogram, Callback]] = {}
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labels: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets, labels))
+
+    def callback(self, name: str, help_text: str, kind: str, read, label: Optional[str] = None) -> Callback:
+        """Export a value another component already tracks ("counter" or "gauge")"""
+        return self._register(Callback(name, help_text, kind, read, label))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,252 @@
+"""
+Mock OpenAI-compatible LLM backend
+Streams chat.completion.chunk SSE with a configurable time to first token, delay per
+token, answer length and injected failures, so the RAG server can be run, benchmarked
+and diagnosed without Groq credentials or Groq's latency variance.
+
+Used in-process with LLM_BACKEND = "mock:<profile>" in rag_server.py, or as a server:
+    python mock_llm.py --profile groq --port 8001
+    (then LLM_BACKEND = "http://localhost:8001/v1")
+"""
+
+from typing import AsyncIterator, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+FILLER_WORDS = (
+    "the mall is open daily and our staff at the information desk on the ground floor "
+    "can help you find shops restaurants parking and services around the building"
+).split()
+
+class MockProfile:
+    """Latency and failure settings for the mock backend (all times in milliseconds)"""
+
+    def __init__(
+        self,
+        ttft_ms: float = 250,
+        token_ms: float = 5,
+        tokens: int = 60,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        stream_error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.ttft_ms = ttft_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.jitter = jitter  # Each delay varies by up to this fraction either way
+        self.error_rate = error_rate  # Requests failing with HTTP 500 before streaming
+        self.stream_error_rate = stream_error_rate  # Streams cut off halfway, without [DONE]
+        self.random = random.Random(seed)
+
+    def delay(self, ms: float) -> float:
+        """Seconds to sleep for a nominal delay, with jitter"""
+        if self.jitter:
+            ms *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(ms, 0) / 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "ttft_ms": self.ttft_ms,
+            "token_ms": self.token_ms,
+            "tokens": self.tokens,
+            "jitter": self.jitter,
+            "error_rate": self.error_rate,
+            "stream_error_rate": self.stream_error_rate,
+        }
+
+# Rough shapes, not measurements: "groq" is a fast hosted 70B model
+PROFILES = {
+    "instant": dict(ttft_ms=0, token_ms=0, tokens=30),
+    "groq": dict(ttft_ms=250, token_ms=4, tokens=60, jitter=0.3),
+    "slow": dict(ttft_ms=1200, token_ms=40, tokens=60, jitter=0.3),
+    "flaky": dict(ttft_ms=250, token_ms=4, tokens=60, jitter=0.3, error_rate=0.05, stream_error_rate=0.05),
+}
+
+def get_profile(name: str = "groq", **overrides) -> MockProfile:
+    """A named profile, with any field overridden (None values are ignored)"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown mock LLM profile: {name} (choose from {', '.join(PROFILES)})")
+    settings = dict(PROFILES[name])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return MockProfile(**settings)
+
+class MockStreamError(Exception):
+    """An injected failure partway through a stream"""
+
+def answer_words(messages: List[Dict], count: int) -> List[str]:
+    """Deterministic answer text: the question echoed back, then filler"""
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    words = ["Mock", "answer", "to:"] + question.split()
+    while len(words) < count:
+        words.extend(FILLER_WORDS)
+    return words[:count]
+
+def _chunk(completion_id: str, model: str, created: int, delta: Dict, finish_reason: Optional[str] = None) -> bytes:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+async def stream_completion(profile: MockProfile, body: Dict) -> AsyncIterator[bytes]:
+    """SSE frames for one streamed completion, paced by the profile"""
+    completion_id = f"chatcmpl-mock-{profile.random.getrandbits(32):08x}"
+    model = body.get("model", "mock")
+    created = int(time.time())
+    count = min(profile.tokens, body.get("max_tokens") or profile.tokens)
+    words = answer_words(body.get("messages", []), count)
+    fail_at = len(words) // 2 if profile.random.random() < profile.stream_error_rate else None
+
+    yield _chunk(completion_id, model, created, {"role": "assistant", "content": ""})
+    await asyncio.sleep(profile.delay(profile.ttft_ms))
+    for i, word in enumerate(words):
+        if i == fail_at:
+            raise MockStreamError("Mock stream cut off")
+        if i:
+            await asyncio.sleep(profile.delay(profile.token_ms))
+        yield _chunk(completion_id, model, created, {"content": word if i == len(words) - 1 else word + " "})
+    yield _chunk(completion_id, model, created, {}, "stop")
+    yield b"data: [DONE]\n\n"
+
+async def complete(profile: MockProfile, body: Dict) -> Dict:
+    """A non-streamed completion, returned after the whole answer would have streamed"""
+    count = min(profile.tokens, body.get("max_tokens") or profile.tokens)
+    await asyncio.sleep(profile.delay(profile.ttft_ms + profile.token_ms * max(count - 1, 0)))
+    return {
+        "id": f"chatcmpl-mock-{profile.random.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(answer_words(body.get("messages", []), count))},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count}
+    }
+
+MODELS_RESPONSE = {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]}
+INJECTED_ERROR = {"error": {"message": "Mock injected error", "type": "server_error"}}
+
+# ==========================
+# IN-PROCESS TRANSPORT
+# ==========================
+class _ByteStream(httpx.AsyncByteStream):
+    def __init__(self, frames: AsyncIterator[bytes]):
+        self.frames = frames
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for frame in self.frames:
+                yield frame
+        except MockStreamError as e:
+            raise httpx.RemoteProtocolError(str(e))
+
+    async def aclose(self):
+        await self.frames.aclose()
+
+class MockLLMTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers OpenAI chat completion requests without a network"""
+
+    def __init__(self, profile: MockProfile):
+        self.profile = profile
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path
+        if request.method == "GET" and path.endswith("/models"):
+            return httpx.Response(200, json=MODELS_RESPONSE)
+        if request.method != "POST" or not path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": f"No mock route for {path}"}})
+
+        body = json.loads(await request.aread())
+        if self.profile.random.random() < self.profile.error_rate:
+            await asyncio.sleep(self.profile.delay(self.profile.ttft_ms))
+            return httpx.Response(500, json=INJECTED_ERROR)
+        if not body.get("stream"):
+            return httpx.Response(200, json=await complete(self.profile, body))
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            stream=_ByteStream(stream_completion(self.profile, body))
+        )
+
+# ==========================
+# STANDALONE SERVER
+# ==========================
+def create_app(profile: MockProfile):
+    """FastAPI app serving /v1/chat/completions and /v1/models with the given profile"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI()
+
+    @app.get("/v1/models")
+    async def models():
+        return MODELS_RESPONSE
+
+    @app.get("/profile")
+    async def current_profile():
+        return profile.to_dict()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if profile.random.random() < profile.error_rate:
+            await asyncio.sleep(profile.delay(profile.ttft_ms))
+            return JSONResponse(INJECTED_ERROR, status_code=500)
+        if not body.get("stream"):
+            return await complete(profile, body)
+        return StreamingResponse(stream_completion(profile, body), media_type="text/event-stream")
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible streaming LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--profile", default="groq", choices=list(PROFILES))
+    parser.add_argument("--ttft-ms", type=float, help="Time to first token")
+    parser.add_argument("--token-ms", type=float, help="Delay between tokens")
+    parser.add_argument("--tokens", type=int, help="Tokens per answer")
+    parser.add_argument("--jitter", type=float, help="Random variation of each delay, as a fraction")
+    parser.add_argument("--error-rate", type=float, help="Share of requests failing with HTTP 500")
+    parser.add_argument("--stream-error-rate", type=float, help="Share of streams cut off halfway")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    profile = get_profile(
+        args.profile,
+        ttft_ms=args.ttft_ms,
+        token_ms=args.token_ms,
+        tokens=args.tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        stream_error_rate=args.stream_error_rate,
+        seed=args.seed
+    )
+
+    import uvicorn
+
+    print("=" * 60)
+    print(f"🧪 Mock LLM server ({args.profile}): http://{args.host}:{args.port}/v1")
+    print(f"   {profile.to_dict()}")
+    print("=" * 60)
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,34 @@ RAG Server for Agora AI Voice Chat
 This server provides a custom LLM endpoint with RAG capabilities
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Union, Tuple
 import os
-import json
+from functools import lru_cache
 import asyncio
 import random
-from openai import AsyncOpenAI
+import time
 import logging
+from knowledge_base import KnowledgeBase, context_sections
+from hybrid import hybrid_rank
+from llm_client import LLMClientManager, resolve_backend
+from response_cache import ResponseCache, replay_chunks
+from semantic_cache import SemanticCache
+from faq_fast_path import FAQFastPath
+from inverted_index import FAQ_SCORE
+from kb_registry import KnowledgeBaseRegistry, VenueConfig, load_venues, DEFAULT_KB_ID
+from embedders import get_embedder
+from context_packer import ContextPacker, get_tokenizer
+from session_store import SessionStore, is_follow_up
+from stage_timer import StageTimer
+from retrieval_executor import RetrievalExecutor, RetrievalOverloaded
+from sse import DONE_FRAME, UpstreamStream, chunk_frame, coalesce, comment_frame, data_frame
+from keyword_matcher import load_keyword_table
+from log_setup import setup_logging
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE, COUNT_BUCKETS
 
-# Setup logging with more detail
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
@@ -27,7 +39,127 @@ app = FastAPI()
 # CONFIGURATION
 # ==========================
 GROQ_API_KEY = "xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Where completions come from: "groq", "mock:<profile>" for the in-process stand-in in
+# mock_llm.py (profiles: instant, groq, slow, flaky; no network or key needed), or the
+# base URL of any OpenAI-compatible server, e.g. "http://localhost:8001/v1" for
+# python mock_llm.py (sent with GROQ_API_KEY)
+LLM_BACKEND = "groq"
+
+# Logging: "DEBUG" is verbose, "INFO" logs a few lines per turn. LOG_FORMAT "json" writes
+# one object per line with stage timings attached. With LOG_ASYNC, records are written
+# by a background thread so log output never blocks request handling.
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
+LOG_ASYNC = True
+
+# Prometheus-style /metrics: per-stage latency histograms, time to first token, stream
+# length, and counters for answer sources, retriever outcomes, fallbacks and errors
+METRICS_ENABLED = True
+
+# Shared LLM connection pool (reused across requests instead of a new TLS handshake per turn)
+LLM_MAX_CONNECTIONS = 100
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_KEEPALIVE_EXPIRY = 30  # seconds
+LLM_HTTP2 = True  # Needs: pip install h2
+LLM_TIMEOUT = 30  # seconds
+# Open a connection to the LLM API while retrieval runs if the pool has been idle this long
+LLM_PREWARM_ENABLED = True
+LLM_PREWARM_AFTER_IDLE = 20  # seconds, below LLM_KEEPALIVE_EXPIRY
+
+# Streaming relay: forward the LLM API's SSE bytes as received instead of parsing and
+# re-encoding every chunk. SSE_FLUSH_MS > 0 batches the frames that arrive within that
+# window into one write (the first frame is never held back).
+SSE_RAW_RELAY = True
+SSE_FLUSH_MS = 0
 KNOWLEDGE_BASE_PATH = "./my_city_info.txt"
+KEYWORDS_PATH = "./location_keywords.json"  # Category -> synonyms table for keyword scoring
+VENUE_NAME = "Central City Mall"
+
+# Extra venues, each with its own knowledge base, served at /rag/<kb_id>/chat/completions
+# or with an X-KB-ID header. The venue above is always available as "default".
+KB_REGISTRY_PATH = "./knowledge_bases.json"
+MAX_RESIDENT_KBS = 8  # Least recently used venues are unloaded beyond this
+MAX_RESIDENT_KB_BYTES = 512 * 1024 * 1024  # Approximate index memory across loaded venues
+
+# Reload the knowledge base when the file changes, re-indexing only edited sections
+KB_WATCH_ENABLED = True
+KB_WATCH_INTERVAL = 2.0  # seconds between file checks
+
+# Keep the original substring keyword matching ("car" also matches "card").
+# Set to False to match whole words only.
+KEYWORD_SUBSTRING_COMPAT = True
+
+# How the knowledge base is cut into chunks: "structured" keeps headings as context on every
+# chunk and keeps Q&A pairs and "Location:"/"Hours:" entries whole; "blank_lines" is the
+# original one-chunk-per-paragraph split
+CHUNKING = "structured"
+MAX_CHUNK_CHARS = 800
+
+# Section ranking: "keyword" (weighted keyword scorer), "bm25", "vector" or "hybrid"
+RETRIEVAL_MODE = "keyword"
+
+# Exact-match answer cache for repeated questions (cleared when the knowledge base changes)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL = 300  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# FAQ fast path: when a Q&A section ranks first with a clear margin and the question
+# shares most of its content words with the stored one, stream the stored answer without
+# calling the LLM. Score and margin are in the retrieval mode's units with the keyword
+# scorer's flat FAQ boost taken out (defaults suit "keyword": category match 10, word overlap 1)
+FAQ_FAST_PATH_ENABLED = False
+FAQ_FAST_PATH_MIN_SCORE = 12
+FAQ_FAST_PATH_MIN_MARGIN = 1
+FAQ_FAST_PATH_MIN_OVERLAP = 0.5  # Jaccard similarity of query and stored question content words
+
+# Semantic answer cache: reuse an answer when a new question embeds close to a recent one
+# and retrieval picked the same sections. Uses EMBEDDER, so a real local model works best.
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Cosine similarity needed for a hit
+SEMANTIC_CACHE_NEAR_MISS_MARGIN = 0.05  # Counted as a near miss within this margin below the threshold
+SEMANTIC_CACHE_MAX_ENTRIES = 512
+
+# Hybrid mode runs these retrievers concurrently and fuses them with reciprocal-rank fusion.
+# Any retriever still running after the budget is dropped for that turn.
+HYBRID_RETRIEVERS = ["keyword", "vector"]
+RETRIEVAL_BUDGET_MS = 150
+
+# Retrieval and query embedding run on a dedicated pool, never on the event loop.
+# "thread", or "process" to search index-file knowledge bases (build_index.py) in worker
+# processes that memory-map the same file. Turns beyond workers + queue are not queued:
+# they fail fast and fall back to the overview, as does a search that misses its timeout.
+RETRIEVAL_EXECUTOR = "thread"
+RETRIEVAL_WORKERS = 4
+RETRIEVAL_MAX_QUEUE = 32
+RETRIEVAL_TIMEOUT_MS = 500
+
+# Vector retrieval: "hashing" (deterministic, no model) or "local:<path to sentence-transformers model>"
+EMBEDDER = "hashing"
+EMBEDDINGS_PATH = "./kb_embeddings.npy"  # Built offline with: python build_embeddings.py
+
+# Prebuilt binary index (python build_index.py). When present and up to date it is
+# memory-mapped instead of indexing the text, so workers share it and start instantly.
+INDEX_PATH = "./kb_index.bin"
+
+# Prompt size limit per turn (system prompt + context + conversation), counted locally.
+# Up to PROMPT_HISTORY_TOKENS of it is kept for earlier turns; sections get the rest.
+PROMPT_TOKEN_BUDGET = 2000
+PROMPT_HISTORY_TOKENS = 500
+TOKENIZER = "approx"  # Or "hf:<path to the model's tokenizer.json>" (pip install tokenizers)
+
+# Conversation-aware retrieval: sections from recent turns of the same conversation
+# (Agora channel + agent, or an X-Session-ID header) are merged into each new turn's hits.
+# Follow-up questions ("what time does it close?") use them fully and, in hybrid mode,
+# only run the keyword retriever.
+SESSION_RETRIEVAL_ENABLED = True
+SESSION_IDLE_TIMEOUT = 120  # seconds, keep in line with IDLE_TIMEOUT in config.py
+SESSION_MAX = 1000
+SESSION_CARRY_TURNS = 2  # Later turns a section stays in context without being retrieved again
+
+log_listener = setup_logging(LOG_LEVEL, LOG_FORMAT, use_queue=LOG_ASYNC)
 
 # ==========================
 # MODELS
@@ -42,158 +174,81 @@ class ChatCompletionRequest(BaseModel):
     stream: bool = True
     max_tokens: Optional[int] = 1000
     temperature: Optional[float] = 0.7
+    # Sent by the agent (llm.params in join_api.py) to identify the conversation
+    channel: Optional[str] = None
+    agent_rtc_uid: Optional[str] = None
 
 # ==========================
 # RAG FUNCTIONS
 # ==========================
-def load_knowledge_base(file_path: str) -> str:
-    """Load the knowledge base from a text file"""
-    try:
-        if not os.path.exists(file_path):
-            logger.error(f"❌ Knowledge base file not found: {file_path}")
-            logger.error(f"Current directory: {os.getcwd()}")
-            logger.error(f"Files in directory: {os.listdir('.')}")
-            return ""
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        logger.info(f"✅ Loaded knowledge base: {len(content)} characters")
-        return content
-    except Exception as e:
-        logger.error(f"❌ Error loading knowledge base: {e}")
-        return ""
-
-def search_knowledge_base(query: str, knowledge_base: str) -> str:
+async def retrieve_context(
+    query: str,
+    knowledge_base: KnowledgeBase,
+    follow_up: bool = False
+) -> Tuple[List[str], List[Tuple[float, int]], Dict]:
     """
-    Enhanced keyword-based search with Q&A format support
-    Works well for location-based queries
+    Retrieve context sections with the configured mode, returning them with the ranking and a retrieval report
+    Follow-up turns skip the hybrid fan-out and only use the keyword index
     """
-    logger.info(f"🔍 Searching for: '{query}'")
-
-    if not knowledge_base:
-        logger.error("❌ Knowledge base is empty!")
-        return ""
-
-    query_lower = query.lower()
-
-    # Define location keywords
-    location_keywords = {
-        'coffee': ['coffee', 'café', 'cafe', 'breeze'],
-        'chinese': ['chinese', 'dragon', 'wok', 'china'],
-        'sri lankan': ['sri lankan', 'ceylon', 'spice', 'srilankan', 'sri'],
-        'washroom': ['washroom', 'toilet', 'restroom', 'bathroom', 'loo', 'wc'],
-        'conference': ['conference', 'hall', 'meeting', 'event'],
-        'subway': ['subway', 'metro', 'train', 'underground'],
-        'parking': ['parking', 'park', 'car'],
-        'food': ['food', 'eat', 'restaurant', 'dining', 'meal'],
-        'shop': ['shop', 'store', 'shopping', 'buy'],
-        'atm': ['atm', 'cash', 'money', 'bank'],
-        'wifi': ['wifi', 'wi-fi', 'internet', 'wireless'],
-        'entrance': ['entrance', 'entry', 'door'],
-        'information': ['information', 'info', 'help', 'desk'],
-        'supermarket': ['supermarket', 'grocery', 'groceries'],
-        'entertainment': ['entertainment', 'movie', 'cinema', 'arcade', 'play'],
-        'second floor': ['second floor', '2nd floor', 'floor 2'],
-        'third floor': ['third floor', '3rd floor', 'floor 3'],
-        'ground floor': ['ground floor', 'first floor', 'floor 1'],
+    if RETRIEVAL_MODE == "hybrid" and not follow_up:
+        logger.info("🔍 Hybrid search for: '%s' using %s", query, HYBRID_RETRIEVERS)
+        ranked, report = await hybrid_rank(
+            query, knowledge_base, HYBRID_RETRIEVERS, budget_ms=RETRIEVAL_BUDGET_MS,
+            rank=retrieval_executor.rank
+        )
+        report["section_ids"] = [section_id for _, section_id in ranked]
+        return context_sections(ranked, knowledge_base), ranked, report
+
+    mode = "keyword" if RETRIEVAL_MODE == "hybrid" else RETRIEVAL_MODE
+    logger.info("🔍 Searching for: '%s' (mode: %s)", query, mode)
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        ranked = await retrieval_executor.rank(query, knowledge_base, mode)
+    except RetrievalOverloaded as e:
+        logger.warning(f"⚠️ Retrieval skipped: {e}")
+        ranked, status = [], "overloaded"
+    except asyncio.TimeoutError:
+        ranked, status = [], "timeout"
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    report = {
+        "mode": mode,
+        "contributors": [mode] if status == "ok" else [],
+        "retrievers": {mode: {"status": status, "ms": elapsed_ms, "hits": len(ranked)}},
+        "ms": elapsed_ms,
+        "section_ids": [section_id for _, section_id in ranked]
     }
-
-    # Split knowledge base into sections
-    sections = knowledge_base.split('\n\n')
-    logger.info(f"📑 Split knowledge base into {len(sections)} sections")
-
-    # Score each section
-    scored_chunks = []
-    for section in sections:
-        if not section.strip():
-            continue
-
-        section_lower = section.lower()
-        score = 0
-
-        # Check for direct keyword matches
-        for category, keywords in location_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                if any(keyword in section_lower for keyword in keywords):
-                    score += 10
-                    logger.debug(f"✓ Category match '{category}' in section starting: {section[:50]}")
-
-        # Check for word overlap
-        query_words = [w for w in query_lower.split() if len(w) > 3]
-        for word in query_words:
-            if word in section_lower:
-                score += 1
-
-        # Boost FAQ sections
-        if section.strip().startswith('Q:') or section.strip().startswith('Where') or section.strip().startswith('How'):
-            score += 5
-            logger.debug(f"✓ FAQ boost for section: {section[:50]}")
-
-        if score > 0:
-            scored_chunks.append((score, section))
-            logger.debug(f"Section score: {score}")
-
-    # Sort by relevance and take top 4
-    scored_chunks.sort(reverse=True, key=lambda x: x[0])
-    top_chunks = [chunk for _, chunk in scored_chunks[:4]]
-
-    if top_chunks:
-        result = "\n\n".join(top_chunks)
-        logger.info(f"✅ Found {len(top_chunks)} relevant sections, total length: {len(result)}")
-        logger.debug(f"First 200 chars of result: {result[:200]}")
-        return result
-
-    # If no matches, return overview and first sections
-    logger.warning("⚠️ No specific matches, returning overview")
-    return "\n\n".join(sections[:3])
+    return context_sections(ranked, knowledge_base), ranked, report
 
 def create_rag_enhanced_messages(
     original_messages: List[ChatMessage],
-    retrieved_context: str
-) -> List[Dict]:
+    retrieved_sections: List[str],
+    venue: Optional[VenueConfig] = None
+) -> Tuple[List[Dict], Dict]:
     """
-    Enhance messages with retrieved context
+    Enhance messages with retrieved context, packed into PROMPT_TOKEN_BUDGET
+    Returns the messages and a report of the sections and turns that fit
     """
-    enhanced_messages = []
+    venue = venue or default_venue
+    turns = [{"role": msg.role, "content": msg.content} for msg in original_messages if msg.role != "system"]
 
     # Add system message with context
-    if retrieved_context:
-        context_message = {
-            "role": "system",
-            "content": f"""You are a helpful tour guide assistant for Central City Mall. You have access to specific information about the mall.
-
-Based on the following information:
-
-{retrieved_context}
-
-Instructions:
-- Answer the user's questions clearly and concisely in 2-3 sentences maximum
-- If asked about a location, provide specific floor and landmark information
-- If the question is about directions, give step-by-step guidance
-- Keep responses friendly and helpful
-- If the information is not in the provided context, say "I don't have that specific information, but you can ask at the information desk on the ground floor"
-- Always be welcoming and professional as a mall guide"""
-        }
-        enhanced_messages.append(context_message)
-        logger.info(f"✅ Created system message with {len(retrieved_context)} chars of context")
+    if retrieved_sections:
+        def system_prompt(context: str) -> str:
+            return venue.system_prompt.format(venue_name=venue.venue_name, context=context)
     else:
         logger.warning("⚠️ No context retrieved, using default message")
-        enhanced_messages.append({
-            "role": "system",
-            "content": "You are a helpful tour guide for Central City Mall. Answer briefly and clearly."
-        })
-
-    # Add original messages
-    for msg in original_messages:
-        if msg.role != "system":
-            enhanced_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-
-    logger.info(f"📝 Total messages sent to LLM: {len(enhanced_messages)}")
-    return enhanced_messages
+
+        def system_prompt(context: str) -> str:
+            return venue.fallback_prompt.format(venue_name=venue.venue_name)
+
+    enhanced_messages, report = context_packer.pack(retrieved_sections, turns, system_prompt)
+    logger.info(
+        "✅ Packed %d/%d sections and %d/%d turns into %d/%d tokens (%d messages)",
+        report['sections_used'], len(retrieved_sections), report['turns_used'], len(turns),
+        report['tokens'], report['budget'], len(enhanced_messages)
+    )
+    return enhanced_messages, report
 
 # ==========================
 # WAITING MESSAGES
@@ -204,6 +259,270 @@ WAITING_MESSAGES = [
     "Good question, finding the information...",
 ]
 
+ERROR_MESSAGE = (
+    "I apologize, I'm having trouble accessing the information right now. "
+    "Please ask at the information desk on the ground floor."
+)
+
+@lru_cache(maxsize=64)
+def waiting_frame(model: str, content: str) -> bytes:
+    """The waiting message as an encoded SSE frame (built once per model and message)"""
+    return chunk_frame("waiting_msg", model, 1234567890, content, role="assistant")
+
+@lru_cache(maxsize=16)
+def error_frame(model: str) -> bytes:
+    return chunk_frame("error_msg", model, 1234567890, ERROR_MESSAGE, role="assistant", finish_reason="stop")
+
+# ==========================
+# STARTUP
+# ==========================
+shared_embedder = None
+
+def get_shared_embedder():
+    """Build the configured embedder once; used by vector retrieval and the semantic cache"""
+    global shared_embedder
+    if shared_embedder is None:
+        shared_embedder = get_embedder(EMBEDDER)
+    return shared_embedder
+
+def build_knowledge_base(venue: Optional[VenueConfig] = None) -> KnowledgeBase:
+    """Load, split and index a venue's knowledge base (the default venue if none is given)"""
+    venue = venue or default_venue
+    modes = HYBRID_RETRIEVERS if RETRIEVAL_MODE == "hybrid" else [RETRIEVAL_MODE]
+
+    knowledge_base = None
+    if venue.index_path and os.path.exists(venue.index_path):
+        knowledge_base = KnowledgeBase.from_index_file(
+            venue.index_path,
+            venue.path,
+            keyword_table=load_keyword_table(venue.keywords_path),
+            substring_compat=KEYWORD_SUBSTRING_COMPAT,
+            chunking=CHUNKING,
+            max_chunk_chars=MAX_CHUNK_CHARS,
+            embedder=get_shared_embedder() if "vector" in modes else None
+        )
+    if knowledge_base is None:
+        knowledge_base = KnowledgeBase.from_file(
+            venue.path,
+            keywords_path=venue.keywords_path,
+            substring_compat=KEYWORD_SUBSTRING_COMPAT,
+            chunking=CHUNKING,
+            max_chunk_chars=MAX_CHUNK_CHARS
+        )
+
+    if not knowledge_base:
+        logger.error(f"❌ Knowledge base for '{venue.kb_id}' is empty! Check file path.")
+    else:
+        if "bm25" in modes:
+            knowledge_base.get_bm25_index()
+        if "vector" in modes and knowledge_base.vector_index is None:
+            knowledge_base.load_vector_index(venue.embeddings_path, get_shared_embedder())
+    return knowledge_base
+
+def drop_cached_answers(previous: KnowledgeBase, knowledge_base: KnowledgeBase):
+    """Free cached answers built from a knowledge base version that was just replaced"""
+    response_cache.discard_version(previous.version)
+    if semantic_cache is not None:
+        semantic_cache.discard_version(previous.version)
+
+llm_api_key, llm_base_url, llm_transport = resolve_backend(LLM_BACKEND, GROQ_API_KEY, GROQ_BASE_URL)
+
+llm_clients = LLMClientManager(
+    api_key=llm_api_key,
+    base_url=llm_base_url,
+    transport=llm_transport,
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    http2=LLM_HTTP2,
+    timeout=LLM_TIMEOUT,
+    warm_after=LLM_PREWARM_AFTER_IDLE
+)
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    ttl_seconds=RESPONSE_CACHE_TTL
+)
+
+retrieval_executor = RetrievalExecutor(
+    kind=RETRIEVAL_EXECUTOR,
+    workers=RETRIEVAL_WORKERS,
+    max_queue=RETRIEVAL_MAX_QUEUE,
+    timeout_ms=RETRIEVAL_TIMEOUT_MS,
+    embedder_spec=EMBEDDER
+)
+
+context_packer = ContextPacker(
+    get_tokenizer(TOKENIZER),
+    budget=PROMPT_TOKEN_BUDGET,
+    history_tokens=PROMPT_HISTORY_TOKENS
+)
+
+sessions = SessionStore(
+    max_sessions=SESSION_MAX,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    carry_turns=SESSION_CARRY_TURNS
+)
+
+faq_fast_path = FAQFastPath(
+    min_score=FAQ_FAST_PATH_MIN_SCORE,
+    min_margin=FAQ_FAST_PATH_MIN_MARGIN,
+    min_overlap=FAQ_FAST_PATH_MIN_OVERLAP,
+    faq_boost=FAQ_SCORE if RETRIEVAL_MODE == "keyword" else 0
+)
+
+semantic_cache: Optional[SemanticCache] = None
+
+default_venue = VenueConfig(
+    DEFAULT_KB_ID,
+    path=KNOWLEDGE_BASE_PATH,
+    keywords_path=KEYWORDS_PATH,
+    embeddings_path=EMBEDDINGS_PATH,
+    index_path=INDEX_PATH,
+    venue_name=VENUE_NAME
+)
+
+kb_registry = KnowledgeBaseRegistry(
+    load_venues(KB_REGISTRY_PATH, default_venue),
+    build_knowledge_base,
+    max_resident=MAX_RESIDENT_KBS,
+    max_bytes=MAX_RESIDENT_KB_BYTES,
+    pinned=[DEFAULT_KB_ID],
+    watch_interval=KB_WATCH_INTERVAL if KB_WATCH_ENABLED else None,
+    on_replace=drop_cached_answers
+)
+
+# ==========================
+# METRICS
+# ==========================
+server_metrics = MetricsRegistry()
+stage_seconds = server_metrics.histogram(
+    "rag_stage_seconds", "Time spent in each stage of a turn", labels=["endpoint", "stage"]
+)
+waiting_seconds = server_metrics.histogram(
+    "rag_waiting_message_seconds", "Time from request arrival to the waiting message"
+)
+first_token_seconds = server_metrics.histogram(
+    "rag_time_to_first_token_seconds", "Time from request arrival to the first LLM token", labels=["endpoint"]
+)
+stream_seconds = server_metrics.histogram(
+    "rag_stream_seconds", "Time from the first LLM token to the end of the stream", labels=["endpoint"]
+)
+request_seconds = server_metrics.histogram(
+    "rag_request_seconds", "Total time per streamed turn", labels=["endpoint", "outcome"]
+)
+stream_deltas = server_metrics.histogram(
+    "rag_stream_deltas", "Content deltas received from the LLM per turn", buckets=COUNT_BUCKETS, labels=["endpoint"]
+)
+stream_writes = server_metrics.histogram(
+    "rag_stream_writes", "Writes to the client per LLM stream (after coalescing)", buckets=COUNT_BUCKETS, labels=["endpoint"]
+)
+requests_total = server_metrics.counter(
+    "rag_requests_total", "Turns by endpoint and outcome (llm, faq, response_cache, semantic_cache, error, cancelled)",
+    labels=["endpoint", "outcome"]
+)
+retrievals_total = server_metrics.counter(
+    "rag_retrievals_total", "Retriever runs by status (ok, timeout, overloaded, error)", labels=["retriever", "status"]
+)
+fallbacks_total = server_metrics.counter(
+    "rag_fallbacks_total", "Turns answered from the overview sections (no_match, retrieval_failed)", labels=["reason"]
+)
+server_metrics.callback(
+    "rag_response_cache_events_total", "Exact-match answer cache lookups and evictions", "counter",
+    lambda: {key: response_cache.stats()[key] for key in ("hits", "misses", "evictions")}, label="event"
+)
+server_metrics.callback(
+    "rag_response_cache_bytes", "Bytes held by the answer cache", "gauge", lambda: response_cache.stats()["bytes"]
+)
+server_metrics.callback(
+    "rag_semantic_cache_events_total", "Semantic answer cache lookups", "counter",
+    lambda: {key: semantic_cache.stats()[key] for key in ("hits", "misses", "near_misses")}
+    if semantic_cache is not None else None,
+    label="event"
+)
+server_metrics.callback(
+    "rag_retrieval_executor_in_flight", "Retrieval tasks running or queued", "gauge",
+    lambda: retrieval_executor.stats()["in_flight"]
+)
+server_metrics.callback(
+    "rag_retrieval_executor_events_total", "Retrieval executor rejections, timeouts and process fallbacks", "counter",
+    lambda: {key: retrieval_executor.stats()[key] for key in ("completed", "rejected", "timeouts", "process_fallbacks")},
+    label="event"
+)
+server_metrics.callback(
+    "rag_knowledge_base_resident_bytes", "Approximate memory of the loaded knowledge bases", "gauge",
+    lambda: kb_registry.resident_bytes()
+)
+server_metrics.callback(
+    "rag_sessions", "Conversations with retrieval state", "gauge",
+    lambda: sessions.stats()["sessions"] if SESSION_RETRIEVAL_ENABLED else None
+)
+
+def record_turn(endpoint: str, timer: StageTimer, outcome: str, retrieval_report: Optional[Dict] = None,
+                deltas: int = 0, writes: int = 0, fallback: Optional[str] = None):
+    """Add one finished (or failed) turn to the metrics"""
+    if not METRICS_ENABLED:
+        return
+    total = timer.elapsed_ms() / 1000
+    requests_total.inc(endpoint=endpoint, outcome=outcome)
+    request_seconds.observe(total, endpoint=endpoint, outcome=outcome)
+    for name, span in timer.spans.items():
+        stage_seconds.observe(span["ms"] / 1000, endpoint=endpoint, stage=name)
+    if "waiting_sent" in timer.marks:
+        waiting_seconds.observe(timer.marks["waiting_sent"] / 1000)
+    if "first_token" in timer.marks:
+        first_token = timer.marks["first_token"] / 1000
+        first_token_seconds.observe(first_token, endpoint=endpoint)
+        stream_seconds.observe(total - first_token, endpoint=endpoint)
+    if outcome == "llm":
+        stream_deltas.observe(deltas, endpoint=endpoint)
+        stream_writes.observe(writes, endpoint=endpoint)
+    if retrieval_report is not None:
+        for retriever, result in retrieval_report["retrievers"].items():
+            retrievals_total.inc(retriever=retriever, status=result["status"])
+    if fallback is not None:
+        fallbacks_total.inc(reason=fallback)
+
+@app.on_event("startup")
+async def load_shared_knowledge_base():
+    """Load the default venue's knowledge base once; other venues load on first use"""
+    global semantic_cache
+    knowledge_base = kb_registry.load_now(DEFAULT_KB_ID)
+    kb_registry.start_watchers()
+    await retrieval_executor.start(knowledge_base)
+    if SEMANTIC_CACHE_ENABLED and semantic_cache is None:
+        semantic_cache = SemanticCache(
+            get_shared_embedder(),
+            max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+            threshold=SEMANTIC_CACHE_THRESHOLD,
+            near_miss_margin=SEMANTIC_CACHE_NEAR_MISS_MARGIN,
+            ttl_seconds=RESPONSE_CACHE_TTL
+        )
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    """Close the shared LLM connection pool"""
+    await llm_clients.close()
+
+@app.on_event("shutdown")
+async def stop_kb_watcher():
+    """Stop watching the knowledge base files"""
+    await kb_registry.close()
+
+@app.on_event("shutdown")
+async def stop_retrieval_executor():
+    """Stop the retrieval worker pool"""
+    retrieval_executor.shutdown()
+
+def publish_knowledge_base(knowledge_base: KnowledgeBase):
+    """Swap in a rebuilt default knowledge base; turns already running keep the one they started with"""
+    kb_registry.publish(DEFAULT_KB_ID, knowledge_base)
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the default venue's knowledge base, loading it if startup did not run"""
+    return kb_registry.load_now(DEFAULT_KB_ID)
+
 # ==========================
 # ENDPOINTS
 # ==========================
@@ -214,22 +533,38 @@ async def root():
         "endpoints": {
             "/chat/completions": "Standard chat completions",
             "/rag/chat/completions": "RAG-enhanced chat completions",
-            "/health": "Health check"
+            "/rag/{kb_id}/chat/completions": "RAG-enhanced chat completions for one venue",
+            "/health": "Health check",
+            "/metrics": "Prometheus metrics"
         },
         "status": "running"
     }
 
 @app.get("/health")
 async def health():
-    kb_exists = os.path.exists(KNOWLEDGE_BASE_PATH)
-    kb_size = os.path.getsize(KNOWLEDGE_BASE_PATH) if kb_exists else 0
+    knowledge_base = get_knowledge_base()
     return {
         "status": "healthy",
-        "knowledge_base_loaded": kb_exists,
-        "knowledge_base_size": kb_size,
-        "groq_api_configured": bool(GROQ_API_KEY)
+        "knowledge_base_loaded": bool(knowledge_base),
+        "knowledge_base_size": len(knowledge_base.text.encode('utf-8')),
+        "knowledge_base_sections": len(knowledge_base),
+        "groq_api_configured": bool(GROQ_API_KEY),
+        "llm_backend": LLM_BACKEND,
+        "faq_fast_path": faq_fast_path.stats() if FAQ_FAST_PATH_ENABLED else None,
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "knowledge_bases": kb_registry.stats(),
+        "sessions": sessions.stats() if SESSION_RETRIEVAL_ENABLED else None,
+        "retrieval_executor": retrieval_executor.stats()
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of the counters and histograms above"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(server_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/chat/completions")
 async def chat_completions(request: ChatCompletionRequest):
     """Standard OpenAI-compatible chat completions endpoint"""
@@ -239,32 +574,48 @@ async def chat_completions(request: ChatCompletionRequest):
         if not request.stream:
             raise HTTPException(status_code=400, detail="Chat completions require streaming")
 
+        timer = StageTimer()
+
         async def generate():
+            response = None
+            outcome = "cancelled"
+            deltas = writes = 0
             try:
-                client = AsyncOpenAI(
-                    api_key=GROQ_API_KEY,
-                    base_url="https://api.groq.com/openai/v1"
-                )
-
                 messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
 
-                response = await client.chat.completions.create(
-                    model=request.model,
-                    messages=messages,
-                    stream=True,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature
-                )
-
-                async for chunk in response:
-                    yield f"data: {json.dumps(chunk.model_dump())}\n\n"
-
-                yield "data: [DONE]\n\n"
+                with timer.stage("llm_open"):
+                    response = await UpstreamStream.open(
+                        llm_clients.get(),
+                        raw=SSE_RAW_RELAY,
+                        model=request.model,
+                        messages=messages,
+                        max_tokens=request.max_tokens,
+                        temperature=request.temperature
+                    )
+
+                def on_content(content: str):
+                    nonlocal deltas
+                    if not deltas:
+                        timer.mark("first_token")
+                    deltas += 1
+
+                async for frame in coalesce(response.frames(on_content), SSE_FLUSH_MS):
+                    writes += 1
+                    yield frame
+
+                outcome = "llm"
+                yield DONE_FRAME
 
             except Exception as e:
                 logger.error(f"❌ Error in chat completion: {e}")
+                outcome = "error"
                 error_msg = {"error": str(e)}
-                yield f"data: {json.dumps(error_msg)}\n\n"
+                yield data_frame(error_msg)
+
+            finally:
+                record_turn("chat", timer, outcome, deltas=deltas, writes=writes)
+                if response is not None:
+                    await response.close()
 
         return StreamingResponse(generate(), media_type="text/event-stream")
 
@@ -273,108 +624,280 @@ async def chat_completions(request: ChatCompletionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/rag/chat/completions")
-async def rag_chat_completions(request: ChatCompletionRequest):
-    """RAG-enhanced chat completions endpoint"""
+async def rag_chat_completions(
+    request: ChatCompletionRequest,
+    x_kb_id: Optional[str] = Header(None),
+    x_session_id: Optional[str] = Header(None)
+):
+    """RAG-enhanced chat completions endpoint (venue picked by the X-KB-ID header)"""
+    return await rag_chat_for_venue(request, x_kb_id or DEFAULT_KB_ID, x_session_id)
+
+@app.post("/rag/{kb_id}/chat/completions")
+async def venue_rag_chat_completions(
+    kb_id: str,
+    request: ChatCompletionRequest,
+    x_session_id: Optional[str] = Header(None)
+):
+    """RAG-enhanced chat completions against one venue's knowledge base"""
+    return await rag_chat_for_venue(request, kb_id, x_session_id)
+
+def session_key_for(request: ChatCompletionRequest, kb_id: str, session_id: Optional[str]) -> Optional[str]:
+    """Conversation identity for per-session retrieval, or None if the caller sent none"""
+    if not SESSION_RETRIEVAL_ENABLED:
+        return None
+    if session_id:
+        return f"{kb_id}:{session_id}"
+    if request.channel:
+        return f"{kb_id}:{request.channel}:{request.agent_rtc_uid or ''}"
+    return None
+
+class PreparedTurn:
+    """Everything the response stream needs, produced by prepare_turn while the waiting message goes out"""
+
+    def __init__(self, retrieval_report: Dict):
+        self.retrieval_report = retrieval_report
+        self.prompt_report: Optional[Dict] = None
+        self.replay: Optional[str] = None  # Answer to replay instead of calling the LLM
+        self.replay_id = "cached_msg"
+        self.source = "llm"  # Or faq, response_cache, semantic_cache
+        self.fallback: Optional[str] = None  # Why the overview was used instead of retrieved sections
+        self.response: Optional[UpstreamStream] = None
+        self.cache_key: Optional[str] = None
+        self.query_vector = None
+        self.knowledge_base: Optional[KnowledgeBase] = None
+
+async def prepare_turn(
+    request: ChatCompletionRequest,
+    kb_id: str,
+    venue: VenueConfig,
+    session_id: Optional[str],
+    timer: StageTimer
+) -> PreparedTurn:
+    """
+    Retrieve, build the prompt and open the LLM stream for one turn
+    Started as soon as the request arrives; the connection warm-up runs alongside retrieval.
+    """
+    connecting = llm_clients.warm() if LLM_PREWARM_ENABLED else None
+
+    # Get the venue's knowledge base, loading it on first use
+    with timer.stage("knowledge_base"):
+        knowledge_base = await kb_registry.get(kb_id)
+    if not knowledge_base:
+        logger.error("❌ Knowledge base is empty! Check file path.")
+        raise Exception("Knowledge base could not be loaded")
+
+    with timer.stage("query"):
+        user_messages = [msg for msg in request.messages if msg.role == "user"]
+        last_user_message = user_messages[-1].content if user_messages else ""
+    logger.info("User query: '%s'", last_user_message)
+
+    # Search the knowledge base, lightly for follow-ups in a known conversation
+    with timer.stage("retrieval"):
+        session_key = session_key_for(request, kb_id, session_id)
+        follow_up = session_key is not None \
+            and sessions.get(session_key, knowledge_base.version) is not None \
+            and is_follow_up(last_user_message)
+        retrieved_sections, ranked, retrieval_report = await retrieve_context(
+            last_user_message, knowledge_base, follow_up=follow_up
+        )
+
+        # Merge with the sections recent turns of this conversation used
+        fresh_ranked = ranked
+        if session_key is not None:
+            ranked, retrieval_report["session"] = sessions.merge(
+                session_key, knowledge_base.version, ranked, follow_up
+            )
+            retrieval_report["section_ids"] = [section_id for _, section_id in ranked]
+            retrieved_sections = context_sections(ranked, knowledge_base)
+    logger.info("Retrieved %d sections", len(retrieved_sections))
+
+    turn = PreparedTurn(retrieval_report)
+    turn.knowledge_base = knowledge_base
+    if not ranked:
+        # context_sections() fell back to the overview sections
+        statuses = {result["status"] for result in retrieval_report["retrievers"].values()}
+        turn.fallback = "no_match" if statuses <= {"ok"} else "retrieval_failed"
+
+    with timer.stage("answer_cache"):
+        # Answer straight from a matching Q&A pair (never for follow-ups, which lean on earlier turns)
+        if FAQ_FAST_PATH_ENABLED and not follow_up:
+            faq_entry = faq_fast_path.match(last_user_message, fresh_ranked, knowledge_base.faq_entries)
+            if faq_entry is not None:
+                turn.replay, turn.replay_id, turn.source = faq_entry.answer, "faq_msg", "faq"
+                return turn
+
+        # Replay a cached answer for a repeated question
+        if RESPONSE_CACHE_ENABLED:
+            turn.cache_key = response_cache.make_key(
+                last_user_message, retrieval_report["section_ids"], request.model,
+                request.temperature, knowledge_base.version
+            )
+            turn.replay = response_cache.get(turn.cache_key)
+            if turn.replay is not None:
+                logger.info("⚡ Response cache hit, replaying cached answer")
+                turn.source = "response_cache"
+                return turn
+
+        # Then look for an answer to a similar question
+        if semantic_cache is not None:
+            try:
+                turn.query_vector = await retrieval_executor.run(semantic_cache.embed_query, last_user_message)
+            except (RetrievalOverloaded, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Skipping the semantic cache this turn: {e!r}")
+        if turn.query_vector is not None:
+            turn.replay = semantic_cache.lookup(
+                turn.query_vector, retrieval_report["section_ids"], request.model,
+                request.temperature, knowledge_base.version
+            )
+            if turn.replay is not None:
+                turn.source = "semantic_cache"
+                return turn
+
+    # Create enhanced messages within the prompt budget
+    with timer.stage("prompt"):
+        enhanced_messages, turn.prompt_report = create_rag_enhanced_messages(
+            request.messages, retrieved_sections, venue
+        )
+
+    if connecting is not None and not connecting.is_set():
+        # Let a handshake still in progress finish so the stream can use its connection, but
+        # never wait longer than retrieval took: past that, the warm-up has stopped paying off
+        with timer.stage("llm_warm_wait"):
+            try:
+                await asyncio.wait_for(connecting.wait(), timeout=timer.spans["retrieval"]["ms"] / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+    # Open the LLM stream; returns once the upstream response has started
+    logger.info("🤖 Calling the LLM (%s)...", LLM_BACKEND)
+    with timer.stage("llm_open"):
+        turn.response = await UpstreamStream.open(
+            llm_clients.get(),
+            raw=SSE_RAW_RELAY,
+            model=request.model,
+            messages=enhanced_messages,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature
+        )
+    return turn
+
+def log_timings(kb_id: str, timer: StageTimer):
+    """One line per turn with its stage timings (as fields in the JSON log format)"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("⏱️ Stages (ms since arrival): %s", timer.summary(), extra={"kb_id": kb_id, "timings": timer.report()})
+
+async def rag_chat_for_venue(request: ChatCompletionRequest, kb_id: str, session_id: Optional[str] = None):
     try:
-        logger.info("=" * 60)
-        logger.info("📨 NEW RAG CHAT COMPLETION REQUEST")
-        logger.info("=" * 60)
+        logger.info("📨 New RAG chat completion request (venue: %s)", kb_id, extra={"kb_id": kb_id})
 
         if not request.stream:
             raise HTTPException(status_code=400, detail="Chat completions require streaming")
+        if kb_id not in kb_registry:
+            raise HTTPException(status_code=404, detail=f"Unknown knowledge base '{kb_id}'")
+        venue = kb_registry.venue(kb_id)
+
+        # Retrieval, prompt building and opening the LLM stream start now, overlapping
+        # with the response headers and the waiting message
+        timer = StageTimer()
+        preparing = asyncio.create_task(prepare_turn(request, kb_id, venue, session_id, timer))
+        claimed = False  # Set once generate() runs; from then on it closes the turn
+
+        def release_unclaimed(task: asyncio.Task):
+            """Close the LLM stream of a turn whose response body never started (caller gone first)"""
+            if claimed:
+                return
+            if task.cancelled() or task.exception() is not None:
+                record_turn("rag", timer, "cancelled")
+                return
+            turn = task.result()
+            record_turn("rag", timer, "cancelled", retrieval_report=turn.retrieval_report, fallback=turn.fallback)
+            if turn.response is not None:
+                asyncio.ensure_future(turn.response.close())
+
+        preparing.add_done_callback(release_unclaimed)
 
         async def generate():
+            nonlocal claimed
+            claimed = True
+            turn = None
+            outcome = "cancelled"
+            deltas = writes = 0
             try:
-                # Step 1: Send waiting message
-                logger.info("⏳ Step 1: Sending waiting message...")
-                waiting_msg = {
-                    "id": "waiting_msg",
-                    "object": "chat.completion.chunk",
-                    "created": 1234567890,
-                    "model": request.model,
-                    "choices": [{
-                        "index": 0,
-                        "delta": {
-                            "role": "assistant",
-                            "content": random.choice(WAITING_MESSAGES)
-                        },
-                        "finish_reason": None
-                    }]
-                }
-                yield f"data: {json.dumps(waiting_msg)}\n\n"
-
-                # Step 2: Load knowledge base
-                logger.info("📚 Step 2: Loading knowledge base...")
-                knowledge_base = load_knowledge_base(KNOWLEDGE_BASE_PATH)
-                if not knowledge_base:
-                    logger.error("❌ Knowledge base is empty! Check file path.")
-                    raise Exception("Knowledge base could not be loaded")
-
-                # Step 3: Get the last user message
-                logger.info("💬 Step 3: Extracting user query...")
-                user_messages = [msg for msg in request.messages if msg.role == "user"]
-                last_user_message = user_messages[-1].content if user_messages else ""
-                logger.info(f"User query: '{last_user_message}'")
-
-                # Step 4: Search knowledge base
-                logger.info("🔍 Step 4: Searching knowledge base...")
-                retrieved_context = search_knowledge_base(last_user_message, knowledge_base)
-                logger.info(f"Retrieved context length: {len(retrieved_context)} characters")
-
-                if not retrieved_context:
-                    logger.warning("⚠️ No context retrieved! Using fallback.")
-                    retrieved_context = knowledge_base[:500]  # Use first 500 chars as fallback
-
-                # Step 5: Create enhanced messages
-                logger.info("🔧 Step 5: Creating enhanced messages...")
-                enhanced_messages = create_rag_enhanced_messages(request.messages, retrieved_context)
-
-                # Step 6: Call LLM
-                logger.info("🤖 Step 6: Calling Groq API...")
-                client = AsyncOpenAI(
-                    api_key=GROQ_API_KEY,
-                    base_url="https://api.groq.com/openai/v1"
-                )
-
-                response = await client.chat.completions.create(
-                    model=request.model,
-                    messages=enhanced_messages,
-                    stream=True,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature
-                )
-
-                # Step 7: Stream the response
-                logger.info("📡 Step 7: Streaming response...")
-                chunk_count = 0
-                async for chunk in response:
-                    chunk_count += 1
-                    yield f"data: {json.dumps(chunk.model_dump())}\n\n"
-
-                logger.info(f"✅ Streamed {chunk_count} chunks successfully")
-                yield "data: [DONE]\n\n"
+                # Send the waiting message while the turn is prepared
+                yield waiting_frame(request.model, random.choice(WAITING_MESSAGES))
+                timer.mark("waiting_sent")
+
+                turn = await preparing
+                timer.mark("prepared")
+
+                # Report which retrievers contributed as an SSE comment, ignored by clients
+                yield comment_frame("retrieval", turn.retrieval_report)
+
+                if turn.replay is not None:
+                    for frame in replay_chunks(turn.replay, request.model, chunk_id=turn.replay_id):
+                        if frame == DONE_FRAME:
+                            yield comment_frame("timings", timer.report())
+                        yield frame
+                    outcome = turn.source
+                    log_timings(kb_id, timer)
+                    return
+
+                yield comment_frame("prompt", turn.prompt_report)
+
+                # Stream the response
+                logger.info("📡 Streaming response...")
+                answer_parts = []
+
+                def on_content(content: str):
+                    if not answer_parts:
+                        timer.mark("first_token")
+                    answer_parts.append(content)
+
+                async for frame in coalesce(turn.response.frames(on_content), SSE_FLUSH_MS):
+                    writes += 1
+                    yield frame
+
+                deltas = len(answer_parts)
+                outcome = "llm"
+                logger.info("✅ Streamed %d deltas in %d writes", deltas, writes)
+                log_timings(kb_id, timer)
+                yield comment_frame("timings", timer.report())
+                yield DONE_FRAME
+
+                answer = "".join(answer_parts)
+                if turn.cache_key is not None:
+                    response_cache.put(turn.cache_key, answer)
+                if turn.query_vector is not None:
+                    semantic_cache.store(
+                        turn.query_vector, turn.retrieval_report["section_ids"], request.model,
+                        request.temperature, answer, turn.knowledge_base.version
+                    )
 
             except Exception as e:
                 logger.error(f"❌ ERROR in RAG pipeline: {str(e)}", exc_info=True)
-                error_msg = {
-                    "id": "error_msg",
-                    "object": "chat.completion.chunk",
-                    "created": 1234567890,
-                    "model": request.model,
-                    "choices": [{
-                        "index": 0,
-                        "delta": {
-                            "role": "assistant",
-                            "content": "I apologize, I'm having trouble accessing the information right now. Please ask at the information desk on the ground floor."
-                        },
-                        "finish_reason": "stop"
-                    }]
-                }
-                yield f"data: {json.dumps(error_msg)}\n\n"
-                yield "data: [DONE]\n\n"
+                outcome = "error"
+                yield error_frame(request.model)
+                yield DONE_FRAME
+
+            finally:
+                # The caller may hang up mid-turn: stop preparing and release the upstream stream
+                if not preparing.done():
+                    preparing.cancel()
+                elif turn is None and not preparing.cancelled() and preparing.exception() is None:
+                    turn = preparing.result()
+                record_turn(
+                    "rag", timer, outcome,
+                    retrieval_report=turn.retrieval_report if turn is not None else None,
+                    deltas=deltas, writes=writes,
+                    fallback=turn.fallback if turn is not None else None
+                )
+                if turn is not None and turn.response is not None:
+                    await turn.response.close()
 
         return StreamingResponse(generate(), media_type="text/event-stream")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ RAG chat completion error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -389,6 +912,7 @@ if __name__ == "__main__":
     print("🚀 Starting RAG Server - Mall Guide Edition")
     print("=" * 60)
     print(f"📚 Knowledge Base: {KNOWLEDGE_BASE_PATH}")
+    print(f"🤖 LLM backend: {LLM_BACKEND}")
 
     # Check if knowledge base exists
     if os.path.exists(KNOWLEDGE_BASE_PATH):
@@ -402,9 +926,10 @@ if __name__ == "__main__":
     print("🌐 Endpoints:")
     print("   - http://localhost:8000")
     print("   - http://localhost:8000/health")
+    print("   - http://localhost:8000/metrics")
     print("   - http://localhost:8000/rag/chat/completions")
     print("=" * 60)
-    print("📝 Logging level: DEBUG (verbose)")
+    print(f"📝 Logging level: {LOG_LEVEL} ({LOG_FORMAT}{', async' if LOG_ASYNC else ''})")
     print("=" * 60)
 
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
@@ -0,0 +1,140 @@
+"""
+Exact-match response cache for repeated questions
+Answers are keyed on the knowledge base version, the normalised question, the retrieved
+sections, the model and the temperature bucket, and replayed as a synthetic chat.completion.chunk stream
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import re
+import time
+import logging
+
+from sse import DONE_FRAME, data_frame
+
+logger = logging.getLogger(__name__)
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+REPLAY_WORDS_PER_CHUNK = 4
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(PUNCTUATION_PATTERN.sub(" ", text.lower()).split())
+
+def temperature_bucket(temperature: Optional[float]) -> int:
+    """Bucket temperatures to one decimal so 0.70 and 0.7 share entries"""
+    return round((temperature or 0.0) * 10)
+
+class ResponseCache:
+    """
+    LRU cache of complete answers with a TTL and a total size limit
+    Keys include the knowledge base version, so answers never outlive the content
+    they were built from; discard_version() drops a replaced version eagerly.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 4 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        query: str,
+        section_ids: List[int],
+        model: str,
+        temperature: Optional[float],
+        kb_version: str
+    ) -> Tuple:
+        return (kb_version, normalize_query(query), tuple(section_ids), model, temperature_bucket(temperature))
+
+    def _remove(self, key: Tuple):
+        _, answer = self._entries.pop(key)
+        self._bytes -= len(answer.encode('utf-8'))
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Return a fresh cached answer, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, answer = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return answer
+
+    def put(self, key: Tuple, answer: str):
+        """Store an answer, evicting least recently used entries to stay within limits"""
+        size = len(answer.encode('utf-8'))
+        if not answer or size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic(), answer)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def discard_version(self, kb_version: str):
+        """Drop every answer built from a knowledge base version that was replaced"""
+        stale = [key for key in self._entries if key[0] == kb_version]
+        for key in stale:
+            self._remove(key)
+        if stale:
+            logger.info(f"🧹 Dropped {len(stale)} cached answers for knowledge base {kb_version}")
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+def replay_chunks(answer: str, model: str, chunk_id: str = "cached_msg") -> Iterator[bytes]:
+    """Stream a stored answer as SSE chat.completion.chunk frames, ending with [DONE]"""
+    created = int(time.time())
+    words = answer.split(" ")
+
+    def frame(delta: Dict, finish_reason: Optional[str]) -> bytes:
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": delta,
+                "finish_reason": finish_reason
+            }]
+        }
+        return data_frame(chunk)
+
+    for start in range(0, len(words), REPLAY_WORDS_PER_CHUNK):
+        piece = " ".join(words[start:start + REPLAY_WORDS_PER_CHUNK])
+        if start + REPLAY_WORDS_PER_CHUNK < len(words):
+            piece += " "
+        delta = {"role": "assistant", "content": piece} if start == 0 else {"content": piece}
+        yield frame(delta, None)
+
+    yield frame({}, "stop")
+    yield DONE_FRAME
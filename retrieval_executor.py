@@ -0,0 +1,209 @@
+"""
+Dedicated executor for retrieval work
+Scoring and query embedding run on their own thread or process pool instead of the event
+loop, with a bounded queue and a per-task timeout, so one slow search cannot stall the
+token streams of every other call on the worker
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import multiprocessing
+import threading
+import logging
+
+from knowledge_base import KnowledgeBase, rank_sections
+
+logger = logging.getLogger(__name__)
+
+# "process" only applies to knowledge bases opened from an index file (build_index.py):
+# each worker process memory-maps the same file. Others are searched on the thread pool.
+EXECUTOR_KINDS = ("thread", "process")
+WORKER_CACHED_KBS = 4  # Index files each worker process keeps open
+
+class RetrievalOverloaded(Exception):
+    """Raised instead of queueing when every worker is busy and the queue is full"""
+
+# ==========================
+# PROCESS WORKERS
+# ==========================
+_worker_kbs: "OrderedDict[Tuple, KnowledgeBase]" = OrderedDict()
+
+def _worker_knowledge_base(spec: Tuple) -> KnowledgeBase:
+    """Open (once per worker process) the index file a knowledge base was loaded from"""
+    knowledge_base = _worker_kbs.get(spec)
+    if knowledge_base is None:
+        index_path, version, substring_compat, chunking, max_chunk_chars, embedder_spec = spec
+        embedder = None
+        if embedder_spec:
+            from embedders import get_embedder
+            embedder = get_embedder(embedder_spec)
+        knowledge_base = KnowledgeBase.from_index_file(
+            index_path,
+            substring_compat=substring_compat,
+            chunking=chunking,
+            max_chunk_chars=max_chunk_chars,
+            embedder=embedder
+        )
+        if knowledge_base is None or knowledge_base.version != version:
+            raise ValueError(f"Index file {index_path} no longer holds knowledge base version {version}")
+        _worker_kbs[spec] = knowledge_base
+        while len(_worker_kbs) > WORKER_CACHED_KBS:
+            _worker_kbs.popitem(last=False)
+    _worker_kbs.move_to_end(spec)
+    return knowledge_base
+
+def _open_in_worker(spec: Tuple) -> int:
+    return len(_worker_knowledge_base(spec))
+
+def _rank_in_worker(spec: Tuple, query: str, mode: str, top_k: int) -> List[Tuple[float, int]]:
+    return rank_sections(query, _worker_knowledge_base(spec), mode, top_k)
+
+# ==========================
+# EXECUTOR
+# ==========================
+class RetrievalExecutor:
+    """
+    Runs retrieval off the event loop on `workers` threads or processes
+
+    At most `workers + max_queue` tasks are admitted at once; beyond that calls fail
+    fast with RetrievalOverloaded. Callers stop waiting after `timeout_ms`. A task that
+    has not started yet is then cancelled; one already running finishes in the
+    background and keeps its slot until it does.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 4,
+        max_queue: int = 32,
+        timeout_ms: float = 500,
+        embedder_spec: Optional[str] = None
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown retrieval executor: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout_ms = timeout_ms
+        self.embedder_spec = embedder_spec
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.process_fallbacks = 0
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="retrieval")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"⚙️ Started {self.workers} retrieval worker processes")
+        return self._processes
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def _submit(self, pool: Executor, fn: Callable, *args):
+        """Admit, run and wait for one task within the timeout"""
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise RetrievalOverloaded(f"{self.in_flight} retrieval tasks already in flight")
+            self.in_flight += 1
+
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"⚠️ Retrieval task missed its {self.timeout_ms}ms timeout")
+            raise
+
+    def _spec(self, knowledge_base: KnowledgeBase) -> Tuple:
+        """What a worker process needs to open the same knowledge base from its index file"""
+        embedder_spec = self.embedder_spec if knowledge_base.vector_index is not None else None
+        return (
+            knowledge_base.index_path, knowledge_base.version, knowledge_base.substring_compat,
+            knowledge_base.chunking, knowledge_base.max_chunk_chars, embedder_spec
+        )
+
+    async def start(self, knowledge_base: KnowledgeBase):
+        """Start the worker processes and open the index in them, so early turns do not pay for it"""
+        if self.kind != "process" or knowledge_base.index_path is None:
+            return
+        pool = self._process_pool()
+        futures = [pool.submit(_open_in_worker, self._spec(knowledge_base)) for _ in range(self.workers)]
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Retrieval worker could not open {knowledge_base.index_path}: {result!r}")
+
+    async def run(self, fn: Callable, *args):
+        """Run any blocking retrieval helper (e.g. query embedding) on the thread pool"""
+        return await self._submit(self._thread_pool(), fn, *args)
+
+    async def rank(
+        self,
+        query: str,
+        knowledge_base: KnowledgeBase,
+        mode: str = "keyword",
+        top_k: int = 4
+    ) -> List[Tuple[float, int]]:
+        """rank_sections off the event loop"""
+        if self.kind == "process" and knowledge_base.index_path is not None:
+            try:
+                return await self._submit(
+                    self._process_pool(), _rank_in_worker, self._spec(knowledge_base), query, mode, top_k
+                )
+            except ValueError as e:
+                # The index file was rebuilt under this process; search the loaded copy instead
+                self.process_fallbacks += 1
+                logger.warning(f"⚠️ {e}, searching on the thread pool")
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool next time
+                self.process_fallbacks += 1
+                self._processes = None
+                logger.error("❌ Retrieval worker process died, searching on the thread pool")
+        return await self._submit(self._thread_pool(), rank_sections, query, knowledge_base, mode, top_k)
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "process_fallbacks": self.process_fallbacks,
+        }
+
+    def shutdown(self):
+        """Stop the pools without waiting for tasks nobody is waiting on"""
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processes = None
@@ -0,0 +1,161 @@
+"""
+Semantic answer cache keyed on query embeddings
+Serves a recent answer when a new question is close enough in embedding space
+and retrieval picked the same sections
+"""
+
+from typing import Dict, List, Optional, Tuple
+import time
+import logging
+import numpy as np
+
+from response_cache import temperature_bucket
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    Fixed-size cache of (query embedding, answer) slots
+    Embeddings live in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product. Full caches overwrite the least recently used slot.
+
+    A lookup is a hit when the best compatible entry (same knowledge base version,
+    set of sections, model and temperature bucket) reaches `threshold`, and a near miss when it falls within
+    `near_miss_margin` below it.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        max_entries: int = 512,
+        threshold: float = 0.92,
+        near_miss_margin: float = 0.05,
+        ttl_seconds: float = 300
+    ):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.near_miss_margin = near_miss_margin
+        self.ttl_seconds = ttl_seconds
+
+        self.matrix = np.zeros((max_entries, embedder.dim), dtype=np.float32)
+        self.keys: List[Optional[Tuple]] = [None] * max_entries
+        self.answers: List[Optional[str]] = [None] * max_entries
+        self.stored_at = np.zeros(max_entries, dtype=np.float64)
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a question once so lookup and store can share the vector"""
+        return self.embedder.embed([query])[0]
+
+    def lookup(
+        self,
+        query_vector: np.ndarray,
+        section_ids: List[int],
+        model: str,
+        temperature: Optional[float],
+        kb_version: str
+    ) -> Optional[str]:
+        """Return a cached answer for a similar question, or None"""
+        if self.size == 0:
+            self.misses += 1
+            return None
+
+        key = (kb_version, tuple(sorted(section_ids)), model, temperature_bucket(temperature))
+        now = time.monotonic()
+        similarities = self.matrix[:self.size] @ query_vector
+        compatible = np.array([
+            self.keys[slot] == key and now - self.stored_at[slot] <= self.ttl_seconds
+            for slot in range(self.size)
+        ])
+        similarities[~compatible] = -1.0
+
+        best = int(np.argmax(similarities))
+        best_similarity = float(similarities[best])
+        if best_similarity >= self.threshold:
+            self.hits += 1
+            self.last_used[best] = now
+            logger.info("⚡ Semantic cache hit (similarity %.3f)", best_similarity)
+            return self.answers[best]
+
+        if best_similarity >= self.threshold - self.near_miss_margin:
+            self.near_misses += 1
+            logger.info("〰️ Semantic cache near miss (similarity %.3f)", best_similarity)
+        else:
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        query_vector: np.ndarray,
+        section_ids: List[int],
+        model: str,
+        temperature: Optional[float],
+        answer: str,
+        kb_version: str
+    ):
+        """Remember an answer, overwriting the least recently used slot when full"""
+        if not answer:
+            return
+
+        if self.size < self.max_entries:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+
+        now = time.monotonic()
+        self.matrix[slot] = query_vector
+        self.keys[slot] = (kb_version, tuple(sorted(section_ids)), model, temperature_bucket(temperature))
+        self.answers[slot] = answer
+        self.stored_at[slot] = now
+        self.last_used[slot] = now
+
+    def discard_version(self, kb_version: str):
+        """
+        Drop the answers built from a replaced knowledge base version
+        The remaining slots are compacted to the front, so lookups stop scanning the
+        freed ones and new answers fill them before anything is evicted.
+        """
+        live = [
+            slot for slot in range(self.size)
+            if self.keys[slot] is not None and self.keys[slot][0] != kb_version
+        ]
+        if len(live) == self.size:
+            return
+
+        count = len(live)
+        self.matrix[:count] = self.matrix[live]
+        self.stored_at[:count] = self.stored_at[live]
+        self.last_used[:count] = self.last_used[live]
+        self.keys[:count] = [self.keys[slot] for slot in live]
+        self.answers[:count] = [self.answers[slot] for slot in live]
+
+        self.matrix[count:self.size] = 0
+        self.stored_at[count:self.size] = 0
+        self.last_used[count:self.size] = 0
+        self.keys[count:self.size] = [None] * (self.size - count)
+        self.answers[count:self.size] = [None] * (self.size - count)
+        self.size = count
+
+    def clear(self):
+        self.matrix[:] = 0
+        self.keys = [None] * self.max_entries
+        self.answers = [None] * self.max_entries
+        self.stored_at[:] = 0
+        self.last_used[:] = 0
+        self.size = 0
+
+    def stats(self) -> Dict:
+        return {
+            "entries": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "near_misses": self.near_misses,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,140 @@
+"""
+Per-conversation retrieval state
+Remembers which sections recent turns of a conversation used, so a follow-up like
+"what time does it close?" keeps the place it refers to in context
+"""
+
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import time
+import logging
+
+from inverted_index import tokenize
+from hybrid import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+# Words that usually point back to something said earlier
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "there", "they", "them", "their", "this", "those", "these", "one", "ones"
+}
+FOLLOW_UP_MAX_WORDS = 3  # Very short questions ("and parking?") are follow-ups too
+# Small fusion constant: with only a handful of sections per list, rank order should matter
+SESSION_RRF_K = 2
+
+def is_follow_up(query: str) -> bool:
+    """Whether a question reads like it depends on the previous turns"""
+    words = tokenize(query)
+    return bool(words) and (len(words) <= FOLLOW_UP_MAX_WORDS or any(w in FOLLOW_UP_WORDS for w in words))
+
+class SessionState:
+    """Sections carried between the turns of one conversation"""
+
+    def __init__(self, kb_version: str):
+        self.kb_version = kb_version
+        self.sections: Dict[int, Tuple[int, int]] = {}  # section id -> (turns since used, rank then)
+        self.turns = 0
+        self.last_seen = time.monotonic()
+
+class SessionStore:
+    """
+    Bounded LRU of conversation states with idle expiry
+
+    Each turn's fresh ranking is fused with the sections carried from earlier turns,
+    most recently used first. Carried sections count fully on follow-ups and at
+    `decay` otherwise, and are forgotten `carry_turns` turns after they were last
+    used. State is reset if the knowledge base version changes.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_timeout: float = 120,
+        carry_turns: int = 2,
+        decay: float = 0.5,
+        top_k: int = 4
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.carry_turns = carry_turns
+        self.decay = decay
+        self.top_k = top_k
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.follow_ups = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self):
+        """Drop idle sessions; the least recently seen are at the front"""
+        now = time.monotonic()
+        while self._sessions:
+            key, state = next(iter(self._sessions.items()))
+            if now - state.last_seen <= self.idle_timeout:
+                break
+            del self._sessions[key]
+            self.expired += 1
+
+    def get(self, key: str, kb_version: str) -> Optional[SessionState]:
+        """The live state of a conversation, if it has sections for this knowledge base version"""
+        self._expire()
+        state = self._sessions.get(key)
+        if state is None or state.kb_version != kb_version or not state.sections:
+            return None
+        return state
+
+    def merge(
+        self,
+        key: str,
+        kb_version: str,
+        ranked: List[Tuple[float, int]],
+        follow_up: bool
+    ) -> Tuple[List[Tuple[float, int]], Dict]:
+        """
+        Fuse this turn's ranking with the conversation's carried sections and remember the result
+        Returns the merged top-k (fused scores) and a small report for the retrieval comment
+        """
+        self._expire()
+        state = self._sessions.get(key)
+        if state is None or state.kb_version != kb_version:
+            state = SessionState(kb_version)
+
+        carried = sorted(state.sections, key=lambda section_id: state.sections[section_id])
+        carry_weight = 1.0 if follow_up else self.decay
+        merged = reciprocal_rank_fusion(
+            [ranked, [(0.0, section_id) for section_id in carried]],
+            k=SESSION_RRF_K,
+            weights=[1.0, carry_weight]
+        )[:self.top_k] if carried else ranked[:self.top_k]
+
+        fresh_ids = {section_id for _, section_id in ranked}
+        reused = [section_id for _, section_id in merged if section_id not in fresh_ids]
+
+        # Sections used this turn are carried fresh; the rest age out
+        sections = {
+            section_id: (age + 1, rank)
+            for section_id, (age, rank) in state.sections.items()
+            if age + 1 < self.carry_turns
+        }
+        sections.update((section_id, (0, rank)) for rank, (_, section_id) in enumerate(merged))
+        state.sections = sections
+        state.turns += 1
+        state.last_seen = time.monotonic()
+        if follow_up:
+            self.follow_ups += 1
+
+        self._sessions[key] = state
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+        return merged, {"turn": state.turns, "follow_up": follow_up, "reused": reused}
+
+    def stats(self) -> Dict:
+        self._expire()
+        return {
+            "sessions": len(self._sessions),
+            "follow_ups": self.follow_ups,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,165 @@
+"""
+Server-sent event framing for the streaming endpoints
+Constant frames are encoded once, dynamic ones go through orjson when it is installed,
+and upstream LLM chunks can be relayed as the raw bytes the API sent
+"""
+
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: bytes):
+        return orjson.loads(data)
+except ImportError:
+    # Falls back to the stdlib (pip install orjson for the fast path)
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def loads(data: bytes):
+        return json.loads(data)
+
+DONE_FRAME = b"data: [DONE]\n\n"
+DATA_PREFIX = b"data: "
+FRAME_END = b"\n\n"
+
+def data_frame(obj) -> bytes:
+    return DATA_PREFIX + dumps(obj) + FRAME_END
+
+def comment_frame(name: str, obj) -> bytes:
+    """A ': name {...}' comment line; clients ignore it"""
+    return b": " + name.encode("utf-8") + b" " + dumps(obj) + FRAME_END
+
+def chunk_frame(chunk_id: str, model: str, created: int, content: str,
+                role: Optional[str] = None, finish_reason: Optional[str] = None) -> bytes:
+    """One chat.completion.chunk frame with a text delta"""
+    delta = {"role": role, "content": content} if role else {"content": content}
+    return data_frame({
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    })
+
+def _content_of(payload: Dict) -> Optional[str]:
+    choices = payload.get("choices")
+    if choices:
+        return (choices[0].get("delta") or {}).get("content")
+    return None
+
+class UpstreamStream:
+    """
+    An open streaming chat completion, relayed to our client as SSE frames
+
+    raw=True forwards each upstream event byte for byte (only the delta text is read,
+    for caching); raw=False re-encodes the SDK's parsed chunks with pydantic's JSON
+    serializer. The upstream [DONE] is not forwarded, the caller ends the stream.
+    """
+
+    def __init__(self, response, raw: bool, context=None):
+        self.response = response
+        self.raw = raw
+        self._context = context
+
+    @classmethod
+    async def open(cls, client, raw: bool = True, **params) -> "UpstreamStream":
+        """Send the completion request; returns once the upstream response has started"""
+        if raw:
+            context = client.chat.completions.with_streaming_response.create(stream=True, **params)
+            response = await context.__aenter__()
+            return cls(response, raw=True, context=context)
+        return cls(await client.chat.completions.create(stream=True, **params), raw=False)
+
+    async def frames(self, on_content: Callable[[str], None]) -> AsyncIterator[bytes]:
+        """Frames to send downstream; on_content gets each delta's text"""
+        if not self.raw:
+            async for chunk in self.response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    on_content(chunk.choices[0].delta.content)
+                yield DATA_PREFIX + chunk.model_dump_json().encode("utf-8") + FRAME_END
+            return
+
+        event: List[bytes] = []
+        async for line in self.response.iter_lines():
+            if line:
+                event.append(line.encode("utf-8"))
+                continue
+            if not event:
+                continue
+            data = b"\n".join(l[5:].lstrip() for l in event if l.startswith(b"data:"))
+            if data == b"[DONE]":
+                return
+            if data:
+                try:
+                    content = _content_of(loads(data))
+                except ValueError:
+                    content = None
+                if content:
+                    on_content(content)
+            yield b"\n".join(event) + FRAME_END
+            event = []
+
+    async def close(self):
+        if self._context is not None:
+            await self._context.__aexit__(None, None, None)
+            self._context = None
+        elif not self.raw:
+            await self.response.close()
+
+async def coalesce(frames: AsyncIterator[bytes], flush_ms: float) -> AsyncIterator[bytes]:
+    """
+    Micro-batch frames into fewer, larger writes
+    The first frame goes out at once; later ones are held for at most flush_ms and sent
+    together. flush_ms <= 0 passes frames through one by one.
+    """
+    if flush_ms <= 0:
+        async for frame in frames:
+            yield frame
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = frames.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    buffer: List[bytes] = []
+    deadline = 0.0
+    first = True
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(deadline - loop.time(), 0) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield b"".join(buffer)
+                buffer = []
+                continue
+
+            future, pending = pending, None
+            try:
+                frame = future.result()
+            except StopAsyncIteration:
+                break
+            if first:
+                first = False
+                yield frame
+                continue
+            if not buffer:
+                deadline = loop.time() + flush_ms / 1000
+            buffer.append(frame)
+            if loop.time() >= deadline:
+                yield b"".join(buffer)
+                buffer = []
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,42 @@
+"""
+Per-request stage timings
+Every stage records when it started and how long it took, both measured from the
+moment the request arrived, so overlapping stages show up as overlapping spans
+"""
+
+from typing import Dict, Optional
+from contextlib import contextmanager
+import time
+
+class StageTimer:
+    """Millisecond spans and one-off marks for a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.marks: Dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage `name`"""
+        start = self.elapsed_ms()
+        try:
+            yield
+        finally:
+            self.spans[name] = {"start": start, "ms": round(self.elapsed_ms() - start, 2)}
+
+    def mark(self, name: str, at: Optional[float] = None):
+        """Record a point in time (now, unless `at` is given in ms since arrival)"""
+        self.marks[name] = self.elapsed_ms() if at is None else at
+
+    def report(self) -> Dict:
+        return {"stages": self.spans, "marks": self.marks, "total_ms": self.elapsed_ms()}
+
+    def summary(self) -> str:
+        """One log line: stage start+duration, then marks"""
+        parts = [f"{name} {span['start']:.1f}+{span['ms']:.1f}" for name, span in self.spans.items()]
+        parts += [f"{name} @{at:.1f}" for name, at in self.marks.items()]
+        return ", ".join(parts)
@@ -0,0 +1,19 @@
+"""
+Tests for the baseline comparison in eval_retrieval.py
+"""
+
+from eval_retrieval import compare
+
+def results(p95_us: float) -> dict:
+    return {"modes": {"bm25": {
+        "recall": {"@4": 0.8}, "mrr": 0.7, "queries": [], "latency_us": {"p50": 50.0, "p95": p95_us, "mean": 55.0},
+    }}}
+
+def test_microsecond_slowdown_is_noise():
+    # +45% but only 44us: below the 0.2 ms floor
+    assert compare(results(141.0), results(97.0), max_drop=0.0, max_slowdown=0.5, min_slowdown_ms=0.2) == []
+
+def test_large_slowdown_is_a_regression():
+    regressions = compare(results(900.0), results(400.0), max_drop=0.0, max_slowdown=0.5, min_slowdown_ms=0.2)
+
+    assert regressions == ["bm25 p95 latency 400us -> 900us"]
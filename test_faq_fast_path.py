@@ -0,0 +1,42 @@
+"""
+Tests for the FAQ fast path (faq_fast_path.py) on the keyword scorer
+"""
+
+import pytest
+
+from faq_fast_path import FAQFastPath, question_overlap
+from inverted_index import FAQ_SCORE
+from knowledge_base import KnowledgeBase, load_knowledge_base, rank_sections
+
+@pytest.fixture(scope="module")
+def knowledge_base() -> KnowledgeBase:
+    return KnowledgeBase(load_knowledge_base("./my_city_info.txt"))
+
+def fast_path_answer(knowledge_base: KnowledgeBase, query: str):
+    fast_path = FAQFastPath(faq_boost=FAQ_SCORE)
+    return fast_path.match(query, rank_sections(query, knowledge_base, "keyword", 4), knowledge_base.faq_entries)
+
+@pytest.mark.parametrize("query", ["Where can I buy clothes?", "Where can I buy toys?", "Where is the main entrance?"])
+def test_category_only_match_does_not_fire(knowledge_base, query):
+    # These rank the coffee shop Q&A first on the shopping category and the FAQ boost alone
+    assert rank_sections(query, knowledge_base, "keyword", 4)[0][1] in knowledge_base.faq_entries
+    assert fast_path_answer(knowledge_base, query) is None
+
+@pytest.mark.parametrize("query", ["Where is the coffee shop?", "where's the coffee shop", "coffee shop location?"])
+def test_paraphrase_of_the_stored_question_fires(knowledge_base, query):
+    entry = fast_path_answer(knowledge_base, query)
+
+    assert entry is not None
+    assert entry.question == "Where is the coffee shop?"
+
+def test_faq_boost_is_taken_out_of_the_margin():
+    entries = {0: None, 1: None}
+    fast_path = FAQFastPath(min_score=10, min_margin=3, min_overlap=0, faq_boost=5)
+
+    # A non-FAQ runner-up at 14 is 2 behind the FAQ's 16 once the boost is gone
+    assert fast_path.match("q", [(21, 0), (14, 2)], entries) is None
+    assert fast_path.stats()["rejected_margin"] == 1
+
+def test_question_overlap_ignores_question_words_and_plurals():
+    assert question_overlap("where are the washrooms", "Where is the washroom?") == 1.0
+    assert question_overlap("Where can I buy toys?", "Where is the coffee shop?") == 0.0
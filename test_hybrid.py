@@ -0,0 +1,23 @@
+"""
+Tests for hybrid retrieval (hybrid.py)
+"""
+
+import asyncio
+
+from hybrid import hybrid_rank
+from knowledge_base import KnowledgeBase, load_knowledge_base
+from retrieval_executor import RetrievalOverloaded
+
+def test_overloaded_retriever_is_reported_as_overloaded():
+    knowledge_base = KnowledgeBase(load_knowledge_base("./my_city_info.txt"))
+
+    async def rank(query, knowledge_base, mode, depth):
+        if mode == "vector":
+            raise RetrievalOverloaded("test")
+        return [(1.0, 2)]
+
+    ranked, report = asyncio.run(hybrid_rank("coffee", knowledge_base, ["keyword", "vector"], 100, rank=rank))
+
+    assert ranked == [(1 / 61, 2)]
+    assert report["contributors"] == ["keyword"]
+    assert report["retrievers"]["vector"] == {"status": "overloaded"}
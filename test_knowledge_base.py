@@ -0,0 +1,66 @@
+"""
+Tests for knowledge base indexing (knowledge_base.py): the memory-mapped index file
+and incremental rebuilds must rank exactly like a fresh in-memory build
+"""
+
+import json
+
+import pytest
+
+from index_file import write_index_file
+from knowledge_base import KnowledgeBase, load_knowledge_base, rank_sections
+
+KB_PATH = "./my_city_info.txt"
+QUERIES = [item["query"] for item in json.load(open("./eval_queries.json", encoding="utf-8"))["queries"]]
+MODES = ("keyword", "bm25")
+
+@pytest.fixture(scope="module")
+def knowledge_base() -> KnowledgeBase:
+    return KnowledgeBase.from_file(KB_PATH)
+
+def edited_text() -> str:
+    """The venue text with one section edited, one removed and one added"""
+    sections = load_knowledge_base(KB_PATH).split("\n\n")
+    sections[3] = sections[3] + " Now open on Sundays."
+    del sections[10]
+    sections.append("Where is the pharmacy?\nThe pharmacy is on the ground floor next to the supermarket.")
+    return "\n\n".join(sections)
+
+def assert_same_rankings(actual: KnowledgeBase, expected: KnowledgeBase):
+    for mode in MODES:
+        for query in QUERIES:
+            got = rank_sections(query, actual, mode, 10)
+            want = rank_sections(query, expected, mode, 10)
+            assert [section_id for _, section_id in got] == [section_id for _, section_id in want], (mode, query)
+            assert [score for score, _ in got] == pytest.approx([score for score, _ in want]), (mode, query)
+
+def test_mapped_index_ranks_like_the_in_memory_one(knowledge_base, tmp_path):
+    index_path = str(tmp_path / "kb.index")
+    write_index_file(index_path, knowledge_base)
+    mapped = KnowledgeBase.from_index_file(index_path, file_path=KB_PATH, keyword_table=knowledge_base.keyword_table)
+
+    assert mapped is not None
+    assert mapped.version == knowledge_base.version
+    assert mapped.sections == knowledge_base.sections
+    assert_same_rankings(mapped, knowledge_base)
+
+def test_incremental_rebuild_matches_a_fresh_build(knowledge_base):
+    text = edited_text()
+    rebuilt = knowledge_base.rebuild(text)
+    fresh = KnowledgeBase(text, path=KB_PATH, keyword_table=knowledge_base.keyword_table)
+
+    assert rebuilt.diff(knowledge_base) == {"added": 2, "removed": 2, "unchanged": len(knowledge_base) - 2}
+    assert rebuilt.version == fresh.version
+    assert rebuilt.sections == fresh.sections
+    assert_same_rankings(rebuilt, fresh)
+
+def test_incremental_rebuild_from_a_mapped_index(knowledge_base, tmp_path):
+    index_path = str(tmp_path / "kb.index")
+    write_index_file(index_path, knowledge_base)
+    mapped = KnowledgeBase.from_index_file(index_path, file_path=KB_PATH, keyword_table=knowledge_base.keyword_table)
+
+    text = edited_text()
+    assert_same_rankings(
+        mapped.rebuild(text),
+        KnowledgeBase(text, path=KB_PATH, keyword_table=knowledge_base.keyword_table)
+    )
@@ -0,0 +1,50 @@
+"""
+Tests for the shared LLM client's connection warm-up (llm_client.py)
+Turns run in-process against the mock LLM (mock_llm.py)
+"""
+
+import asyncio
+import time
+
+import httpx
+
+import rag_server
+from llm_client import LLMClientManager
+from mock_llm import MockLLMTransport, get_profile
+
+class SlowWarmUpTransport(MockLLMTransport):
+    """Instant chat completions, but anything else (the warm-up) takes a second"""
+
+    def __init__(self):
+        super().__init__(get_profile("instant"))
+        self.warm_ups = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            self.warm_ups += 1
+            await asyncio.sleep(1.0)
+        return await super().handle_async_request(request)
+
+def test_slow_warm_up_does_not_delay_the_first_token(monkeypatch):
+    transport = SlowWarmUpTransport()
+    monkeypatch.setattr(rag_server, "llm_clients", LLMClientManager(
+        api_key="mock", base_url="http://mock-llm/v1", transport=transport
+    ))
+    monkeypatch.setattr(rag_server, "LLM_PREWARM_ENABLED", True)
+    monkeypatch.setattr(rag_server, "RESPONSE_CACHE_ENABLED", False)
+
+    async def first_token_seconds() -> float:
+        started = time.perf_counter()
+        request = rag_server.ChatCompletionRequest(messages=[{"role": "user", "content": "Where is the coffee shop?"}])
+        response = await rag_server.rag_chat_for_venue(request, rag_server.DEFAULT_KB_ID)
+        try:
+            async for chunk in response.body_iterator:
+                if b"chatcmpl-mock" in chunk:
+                    return time.perf_counter() - started
+        finally:
+            await response.body_iterator.aclose()
+            await rag_server.llm_clients.close()
+        raise AssertionError("no token streamed")
+
+    assert asyncio.run(first_token_seconds()) < 0.5
+    assert transport.warm_ups == 1
@@ -0,0 +1,85 @@
+"""
+Tests for the /metrics counters recorded by rag_server.py
+Turns run in-process against the mock LLM (mock_llm.py); run with: python -m pytest test_metrics.py
+"""
+
+import asyncio
+
+import pytest
+
+import rag_server
+from knowledge_base import KnowledgeBase
+from llm_client import LLMClientManager
+from mock_llm import MockLLMTransport, get_profile
+from retrieval_executor import RetrievalOverloaded
+
+@pytest.fixture
+def server(monkeypatch):
+    """rag_server with the instant mock LLM, no answer cache and fresh metrics"""
+    monkeypatch.setattr(rag_server, "llm_clients", LLMClientManager(
+        api_key="mock", base_url="http://mock-llm/v1", transport=MockLLMTransport(get_profile("instant"))
+    ))
+    monkeypatch.setattr(rag_server, "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(rag_server, "SESSION_RETRIEVAL_ENABLED", False)
+    for counter in (rag_server.requests_total, rag_server.retrievals_total, rag_server.fallbacks_total):
+        monkeypatch.setattr(counter, "values", {})
+    return rag_server
+
+def run_turn(server, query: str) -> bytes:
+    """Send one streamed RAG turn and return the whole response body"""
+    async def turn():
+        request = server.ChatCompletionRequest(messages=[{"role": "user", "content": query}])
+        response = await server.rag_chat_for_venue(request, server.DEFAULT_KB_ID)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        await server.llm_clients.close()
+        return body
+    return asyncio.run(turn())
+
+def test_no_match_counts_a_fallback(server, monkeypatch):
+    monkeypatch.setattr(server, "RETRIEVAL_MODE", "bm25")
+    body = run_turn(server, "xyzzy plugh")
+
+    assert body.endswith(b"data: [DONE]\n\n")
+    assert server.fallbacks_total.values == {("no_match",): 1}
+    assert server.requests_total.values == {("rag", "llm"): 1}
+    assert 'rag_fallbacks_total{reason="no_match"} 1' in server.server_metrics.render()
+
+def test_failed_retrieval_counts_a_fallback(server, monkeypatch):
+    async def overloaded(query, knowledge_base, mode, top_k=4):
+        raise RetrievalOverloaded("test")
+
+    monkeypatch.setattr(server.retrieval_executor, "rank", overloaded)
+    run_turn(server, "Where is the coffee shop?")
+
+    assert server.fallbacks_total.values == {("retrieval_failed",): 1}
+    assert server.retrievals_total.values == {("keyword", "overloaded"): 1}
+
+def test_matched_turn_counts_no_fallback(server):
+    run_turn(server, "Where is the coffee shop?")
+
+    assert server.fallbacks_total.values == {}
+    assert server.retrievals_total.values == {("keyword", "ok"): 1}
+    assert server.requests_total.values == {("rag", "llm"): 1}
+
+def test_faq_fast_path_answers_without_the_llm(server, monkeypatch):
+    transport = MockLLMTransport(get_profile("instant"))
+    monkeypatch.setattr(server, "llm_clients", LLMClientManager(
+        api_key="mock", base_url="http://mock-llm/v1", transport=transport
+    ))
+    monkeypatch.setattr(server, "FAQ_FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(server, "LLM_PREWARM_ENABLED", False)
+    stored_answer = KnowledgeBase.from_file("./my_city_info.txt").faq_entries[25].answer
+
+    body = run_turn(server, "where's the coffee shop")
+
+    assert b'"id":"faq_msg"' in body
+    assert stored_answer.split(" ")[0].encode() in body
+    assert transport.requests == 0
+    assert server.requests_total.values == {("rag", "faq"): 1}
+
+def test_category_only_query_goes_to_the_llm(server, monkeypatch):
+    monkeypatch.setattr(server, "FAQ_FAST_PATH_ENABLED", True)
+    body = run_turn(server, "Where can I buy toys?")
+
+    assert b"faq_msg" not in body
+    assert server.requests_total.values == {("rag", "llm"): 1}
@@ -0,0 +1,87 @@
+"""
+Tests for the streaming relay in rag_server.py when the LLM API fails
+Uses the in-process mock LLM (mock_llm.py): error_rate answers HTTP 500,
+stream_error_rate cuts the stream off halfway without [DONE]
+"""
+
+import asyncio
+import json
+from typing import List
+
+import pytest
+
+import rag_server
+from llm_client import LLMClientManager
+from mock_llm import MockLLMTransport, get_profile
+from response_cache import ResponseCache
+
+QUERY = "Where is the coffee shop?"
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Point rag_server at a mock LLM with the given profile overrides; returns its transport"""
+    monkeypatch.setattr(rag_server, "response_cache", ResponseCache())
+    monkeypatch.setattr(rag_server, "LLM_PREWARM_ENABLED", False)
+    monkeypatch.setattr(rag_server, "SESSION_RETRIEVAL_ENABLED", False)
+    monkeypatch.setattr(rag_server.requests_total, "values", {})
+
+    def start(**overrides) -> MockLLMTransport:
+        transport = MockLLMTransport(get_profile("instant", **overrides))
+        monkeypatch.setattr(rag_server, "llm_clients", LLMClientManager(
+            api_key="mock", base_url="http://mock-llm/v1", transport=transport
+        ))
+        return transport
+    return start
+
+def stream(endpoint: str) -> List[str]:
+    """Run one streamed turn and return its SSE data payloads (comment frames dropped)"""
+    async def turn():
+        request = rag_server.ChatCompletionRequest(messages=[{"role": "user", "content": QUERY}])
+        if endpoint == "rag":
+            response = await rag_server.rag_chat_for_venue(request, rag_server.DEFAULT_KB_ID)
+        else:
+            response = await rag_server.chat_completions(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        await rag_server.llm_clients.close()
+        return body.decode()
+    frames = asyncio.run(turn()).split("\n\n")
+    return [frame[len("data: "):] for frame in frames if frame.startswith("data: ")]
+
+def chunk_ids(payloads: List[str]) -> List[str]:
+    return [json.loads(payload)["id"] for payload in payloads if payload != "[DONE]" and "choices" in payload]
+
+def test_rag_upstream_500_ends_with_the_error_message(serve):
+    transport = serve(error_rate=1.0)
+    payloads = stream("rag")
+
+    assert chunk_ids(payloads) == ["waiting_msg", "error_msg"]
+    assert payloads[-1] == "[DONE]"
+    assert transport.requests == 3  # The first attempt and the OpenAI client's two retries
+    assert rag_server.requests_total.values == {("rag", "error"): 1}
+
+def test_rag_stream_cut_midway_is_not_cached(serve):
+    serve(stream_error_rate=1.0)
+    payloads = stream("rag")
+
+    ids = chunk_ids(payloads)
+    assert ids[0] == "waiting_msg" and ids[-1] == "error_msg"
+    assert any(i.startswith("chatcmpl-mock") for i in ids)  # Part of the answer was relayed first
+    assert payloads[-1] == "[DONE]"
+    assert rag_server.response_cache.stats()["entries"] == 0
+    assert rag_server.requests_total.values == {("rag", "error"): 1}
+
+def test_chat_upstream_500_sends_an_error_frame(serve):
+    serve(error_rate=1.0)
+    payloads = stream("chat")
+
+    assert len(payloads) == 1
+    assert "Mock injected error" in json.loads(payloads[0])["error"]
+    assert rag_server.requests_total.values == {("chat", "error"): 1}
+
+def test_chat_stream_cut_midway_sends_an_error_frame(serve):
+    serve(stream_error_rate=1.0)
+    payloads = stream("chat")
+
+    assert chunk_ids(payloads)
+    assert json.loads(payloads[-1]) == {"error": "Mock stream cut off"}
+    assert "[DONE]" not in payloads
@@ -0,0 +1,46 @@
+"""
+Tests for the semantic answer cache (semantic_cache.py)
+"""
+
+import numpy as np
+
+from embedders import get_embedder
+from semantic_cache import SemanticCache
+
+QUESTIONS = ["where is the coffee shop", "chinese food", "where is the washroom", "parking"]
+
+def filled_cache() -> SemanticCache:
+    """Four answers, alternating between knowledge base versions v1 and v2"""
+    cache = SemanticCache(get_embedder("hashing"), max_entries=4)
+    for i, question in enumerate(QUESTIONS):
+        cache.store(cache.embed_query(question), [i], "m", 0.7, f"answer {i}", "v1" if i % 2 else "v2")
+    return cache
+
+def test_lookup_hits_the_same_question_only_for_its_version():
+    cache = filled_cache()
+    vector = cache.embed_query("where is the washroom")
+
+    assert cache.lookup(vector, [2], "m", 0.7, "v2") == "answer 2"
+    assert cache.lookup(vector, [2], "m", 0.7, "v1") is None
+
+def test_discard_version_compacts_the_remaining_answers():
+    cache = filled_cache()
+    cache.discard_version("v1")
+
+    assert cache.size == 2
+    assert cache.answers[:2] == ["answer 0", "answer 2"]
+    assert cache.lookup(cache.embed_query("where is the washroom"), [2], "m", 0.7, "v2") == "answer 2"
+
+    # Freed slots are filled before anything is evicted
+    cache.store(cache.embed_query("atm"), [9], "m", 0.7, "answer 9", "v2")
+    assert cache.size == 3
+    assert cache.answers[:3] == ["answer 0", "answer 2", "answer 9"]
+
+def test_clear_resets_every_slot():
+    cache = filled_cache()
+    cache.clear()
+
+    assert cache.size == 0
+    assert cache.answers == [None] * 4
+    assert not np.any(cache.stored_at) and not np.any(cache.last_used)
+    assert cache.lookup(cache.embed_query("parking"), [3], "m", 0.7, "v1") is None
@@ -0,0 +1,132 @@
+"""
+Dense vector index over knowledge base sections
+Section embeddings live in a float32 .npy matrix that is memory-mapped at startup
+"""
+
+from typing import List, Optional, Tuple
+import os
+import json
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 256
+
+def meta_path_for(embeddings_path: str) -> str:
+    """Sidecar metadata file stored next to the .npy matrix"""
+    return os.path.splitext(embeddings_path)[0] + ".meta.json"
+
+def embed_sections(sections: List[str], embedder) -> np.ndarray:
+    """Embed every section in batches; blank sections get an all-zero row"""
+    matrix = np.zeros((len(sections), embedder.dim), dtype=np.float32)
+    section_ids = [i for i, section in enumerate(sections) if section.strip()]
+    for start in range(0, len(section_ids), EMBED_BATCH_SIZE):
+        batch = section_ids[start:start + EMBED_BATCH_SIZE]
+        matrix[batch] = embedder.embed([sections[i] for i in batch])
+    return matrix
+
+def save_embeddings(embeddings_path: str, matrix: np.ndarray, embedder_name: str, kb_version: str):
+    """Write the embedding matrix and its metadata"""
+    np.save(embeddings_path, np.ascontiguousarray(matrix, dtype=np.float32))
+    meta = {
+        "embedder": embedder_name,
+        "dim": int(matrix.shape[1]),
+        "sections": int(matrix.shape[0]),
+        "kb_version": kb_version,
+        "created": int(time.time()),
+    }
+    with open(meta_path_for(embeddings_path), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+class VectorIndex:
+    """
+    Cosine-similarity search over pre-normalised section embeddings
+    A query is one matrix-vector product followed by argpartition for the top-k.
+    """
+
+    def __init__(self, matrix: np.ndarray, embedder, min_score: float = 0.0):
+        self.matrix = matrix
+        self.embedder = embedder
+        self.min_score = min_score
+
+    @classmethod
+    def build(cls, sections: List[str], embedder, min_score: float = 0.0) -> "VectorIndex":
+        """Embed the sections in memory"""
+        started = time.perf_counter()
+        index = cls(embed_sections(sections, embedder), embedder, min_score=min_score)
+        logger.info(f"🧮 Embedded {len(sections)} sections in {time.perf_counter() - started:.2f}s")
+        return index
+
+    @classmethod
+    def load(
+        cls,
+        embeddings_path: str,
+        embedder,
+        kb_version: str,
+        num_sections: int,
+        min_score: float = 0.0
+    ) -> Optional["VectorIndex"]:
+        """
+        Memory-map a prebuilt embedding matrix
+        Returns None if it is missing or was built for another knowledge base or embedder
+        """
+        meta_path = meta_path_for(embeddings_path)
+        if not os.path.exists(embeddings_path) or not os.path.exists(meta_path):
+            logger.warning(f"⚠️ No prebuilt embeddings at {embeddings_path}")
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get("embedder") != embedder.name or meta.get("kb_version") != kb_version:
+            logger.warning(
+                f"⚠️ Embeddings at {embeddings_path} are stale "
+                f"(embedder {meta.get('embedder')}, kb {meta.get('kb_version')}), ignoring them"
+            )
+            return None
+
+        matrix = np.load(embeddings_path, mmap_mode='r')
+        if matrix.shape != (num_sections, embedder.dim) or matrix.dtype != np.float32:
+            logger.warning(f"⚠️ Embeddings at {embeddings_path} have shape {matrix.shape}, ignoring them")
+            return None
+
+        logger.info(f"✅ Memory-mapped {matrix.shape[0]} section embeddings from {embeddings_path}")
+        return cls(matrix, embedder, min_score=min_score)
+
+    def update(self, old_hashes: List[str], sections: List[str], section_hashes: List[str]) -> "VectorIndex":
+        """
+        Build an in-memory index for a new set of sections
+        Rows of unchanged sections are copied; only new or edited sections are embedded
+        """
+        old_rows = {section_hash: row for row, section_hash in enumerate(old_hashes)}
+        matrix = np.zeros((len(sections), self.embedder.dim), dtype=np.float32)
+        to_embed = []
+        for section_id, section_hash in enumerate(section_hashes):
+            row = old_rows.get(section_hash)
+            if row is not None:
+                matrix[section_id] = self.matrix[row]
+            elif sections[section_id].strip():
+                to_embed.append(section_id)
+
+        if to_embed:
+            matrix[to_embed] = embed_sections([sections[i] for i in to_embed], self.embedder)
+        logger.info(f"🧮 Re-embedded {len(to_embed)} of {len(sections)} sections")
+        return VectorIndex(matrix, self.embedder, min_score=self.min_score)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def score(self, query: str, top_k: int = 4) -> List[Tuple[float, int]]:
+        """Top-k (cosine similarity, section_id) pairs above min_score, best first"""
+        if len(self) == 0:
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+        scores = self.matrix @ query_vector
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(float(scores[i]), int(i)) for i in top if scores[i] > self.min_score]